@@ -1,19 +1,23 @@
 # send_mail.py
 import os
 import requests
+from requests.adapters import HTTPAdapter
 import logging
-from flask import Flask, request, Response, stream_with_context
+from flask import Flask, request, Response, stream_with_context, g
 from datetime import datetime
-import pytz
+from zoneinfo import ZoneInfo
 import threading
-import json
+import orjson
 import re
-import io
+import time
+import functools
 
 app = Flask(__name__)
+# リクエストボディの上限（nginx の client_max_body_size に合わせる）
+app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024
 
 # 日本のタイムゾーンを設定
-japan_tz = pytz.timezone('Asia/Tokyo')
+japan_tz = ZoneInfo('Asia/Tokyo')
 
 from util.util import get_next_request_id, get_client_app_name
 
@@ -21,6 +25,38 @@ from util.util import get_next_request_id, get_client_app_name
 from util.log import setup_logger, log_request, log_response
 logger = setup_logger(__name__)
 
+# 上流への転送用セッション（keep-aliveで TCP/TLS 接続を使い回す）
+SESSION = requests.Session()
+_adapter = HTTPAdapter(pool_connections=64, pool_maxsize=256, max_retries=0)
+SESSION.mount('http://', _adapter)
+SESSION.mount('https://', _adapter)
+
+# 転送先（未設定の場合は転送せずに応答する）
+UPSTREAM_URL = os.getenv('UPSTREAM_URL', '').rstrip('/')
+# (接続タイムアウト, 読み込みタイムアウト) 読み込みは nginx の proxy_read_timeout に合わせる
+UPSTREAM_TIMEOUT = (10, 7200)
+# 上流レスポンスを中継する際のチャンクサイズ
+STREAM_CHUNK_SIZE = 64 * 1024
+# これより大きいリクエストボディはメモリに読み込まず、そのまま上流へ流す
+MAX_BUFFERED_BODY = 1024 * 1024
+# クライアントへ書き出す前に小さなチャンクをまとめるサイズ（1パケット分）と最大待ち時間
+COALESCE_HIGH_WATER_MARK = 1490
+COALESCE_MAX_DELAY_MS = 20
+# 逐次表示されるストリーミング応答（まとめずに届いたチャンクをすぐ返す）
+STREAMING_CONTENT_TYPES = ('text/event-stream', 'application/x-ndjson', 'application/stream+json')
+
+# ホップごとのヘッダー（転送しない）
+HOP_BY_HOP_HEADERS = frozenset({
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+    'te', 'trailer', 'trailers', 'transfer-encoding', 'upgrade',
+})
+
+# リクエスト検証用の正規表現（パストラバーサルと制御文字を1回の走査で検出する）
+_INVALID_PATH_RE = re.compile(r'(?:^|/)\.\.(?:/|$)|[\x00-\x1f\x7f]')
+
+# リクエスト検証のエラーメッセージ
+ERR_INVALID_PATH = "不正なパスが指定されました"
+
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>', methods=['GET', 'POST', 'PUT', 'DELETE'])
 def send_mail(path):
@@ -30,31 +66,141 @@ def send_mail(path):
     """
     # リクエストIDを生成
     request_id = get_next_request_id()
+    # ヘッダーとパスは一度だけ取り出し、以降の処理で使い回す
+    g.cached_path = path
+    g.cached_headers = dict(request.headers)
+    # 大きなボディは読み込まずに転送する（クライアント判定とボディのログ記録は行わない）
+    content_length = request.content_length
+    g.body_buffered = content_length is None or content_length <= MAX_BUFFERED_BODY
     # ストリーミングリクエストかどうかを確認
-    client_name = get_client_app_name(request)
-    # リクエストのログを記録
-    is_confidential = log_request(request_id, request, client_name)
+    client_name = get_client_app_name(request, g.cached_headers) if g.body_buffered else "Unknown"
+    # リクエストのログを記録（クライアント判定で解析済みのJSONを使い回す）
+    parsed_body = request.get_json(silent=True) if g.body_buffered and request.is_json else None
+    is_confidential = log_request(request_id, request, client_name, g.cached_headers, read_body=g.body_buffered, parsed_body=parsed_body)
     # リクエスト検証
-    is_valid, error_message = validate_request(request, path)
+    is_valid, error_message = validate_request(request, g.cached_path)
     if not is_valid:
-        response = Response(json.dumps({ "content": error_message }, ensure_ascii=False), status=400, headers=[('Content-Type', 'application/json')])
+        response = Response(error_body(error_message), status=400, headers=[('Content-Type', 'application/json; charset=utf-8')])
         log_response(request_id, response, is_confidential)
         return response
 
     # レスポンスオブジェクトの初期化
     response = None
     try:
-        response = Response(f"hello", status=200)
-        log_response(request_id, response, is_confidential)
-        return response
+        if not UPSTREAM_URL:
+            response = Response(f"hello", status=200)
+            log_response(request_id, response, is_confidential)
+            return response
+
+        # 上流へ転送し、レスポンスはバッファせずにそのまま中継する
+        url = f"{UPSTREAM_URL}/{path}"
+        if request.query_string:
+            url += "?" + request.query_string.decode('latin-1')
+        headers = {k: v for k, v in filter_hop_by_hop(g.cached_headers) if k.lower() != 'host'}
+        upstream = SESSION.request(
+            request.method,
+            url,
+            headers=headers,
+            data=request.get_data() if g.body_buffered else RequestBodyStream(request.stream, content_length),
+            stream=True,
+            timeout=UPSTREAM_TIMEOUT,
+        )
+        log_response(request_id, upstream, is_confidential, is_stream=True)
+        body = stream_upstream(upstream)
+        # SSE などのトークン単位の応答は、次のチャンクを待たずにそのまま返す
+        if not upstream.headers.get('Content-Type', '').lower().startswith(STREAMING_CONTENT_TYPES):
+            body = coalesce(body)
+        return Response(
+            stream_with_context(body),
+            status=upstream.status_code,
+            headers=filter_hop_by_hop(upstream.raw.headers),
+        )
     except requests.exceptions.RequestException as e:
         logger.error(f"[ERROR] {request_id} - エラーが発生しました: {str(e)}")
         return Response(f"Error: {str(e)}", status=500)
 
-if os.getenv('ENV', '').lower() == 'dev':
+# 開発環境のみデバッガを読み込む（uwsgi.ini の ENV=dev 判定と同じく完全一致で比較）
+if os.environ.get('ENV') == 'dev':
     from util.debug import attach_debugger
     attach_debugger(port=5684)
 
+def filter_hop_by_hop(headers):
+    """
+    ホップごとのヘッダーを除外したヘッダーのリストを返す
+    Args:
+        headers: リクエストまたはレスポンスのヘッダー
+    Returns:
+        list: (ヘッダー名, 値) のリスト
+    """
+    return [(k, v) for k, v in headers.items() if k.lower() not in HOP_BY_HOP_HEADERS]
+
+class RequestBodyStream:
+    """
+    リクエストボディを読み込まずに上流へ送るためのラッパー
+    長さを持つファイルライクオブジェクトとして渡すことで、requests は Content-Length 付きで逐次送信する
+    """
+
+    def __init__(self, stream, length):
+        self.stream = stream
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def read(self, size=-1):
+        return self.stream.read(size)
+
+def stream_upstream(upstream):
+    """
+    上流レスポンスのボディをチャンク単位で返すジェネレータ
+    Content-Encoding をそのまま中継するため、デコードせずに生のバイト列を返す
+    Args:
+        upstream: stream=True で取得した requests の Response オブジェクト
+    """
+    try:
+        for chunk in upstream.raw.stream(STREAM_CHUNK_SIZE, decode_content=False):
+            yield chunk
+    finally:
+        upstream.close()
+
+def coalesce(chunks, hwm=COALESCE_HIGH_WATER_MARK, max_delay_ms=COALESCE_MAX_DELAY_MS):
+    """
+    小さなチャンクをまとめてから返すジェネレータ
+    細切れに届く通常のレスポンスで、チャンクごとの書き込みシステムコールを減らす
+    待ち時間は次のチャンクが届いた時点でしか判定できないため、SSE などのストリーミング応答には使わない
+    （最後のチャンクが次の到着まで返されず、逐次表示が遅れる）
+    Args:
+        chunks: バイト列のイテラブル
+        hwm: このバイト数以上たまったら返す
+        max_delay_ms: 最初のチャンクをためてからこの時間を超えたら返す（次のチャンク到着時に判定）
+    """
+    buf = bytearray()
+    t0 = 0.0
+    max_delay = max_delay_ms / 1000
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if not buf:
+            t0 = time.monotonic()
+        buf += chunk
+        if len(buf) >= hwm or time.monotonic() - t0 > max_delay:
+            yield bytes(buf)
+            buf.clear()
+    if buf:
+        yield bytes(buf)
+
+@functools.lru_cache(maxsize=64)
+def error_body(error_message):
+    """
+    エラーレスポンスのボディ（JSONのバイト列）を返す
+    validate_request のエラーメッセージは固定文言なので、エンコード結果をキャッシュして使い回す
+    Args:
+        error_message: エラーメッセージ
+    Returns:
+        bytes: {"content": error_message} をUTF-8でエンコードしたJSON
+    """
+    return orjson.dumps({"content": error_message})
+
 def validate_request(request, path):
     """
     リクエストの検証を行い、有効なリクエストかどうかを確認する
@@ -64,7 +210,14 @@ def validate_request(request, path):
     Returns:
         (bool, str): 検証結果（True/False）とエラーメッセージ（エラーがない場合はNone）
     """
+    if _INVALID_PATH_RE.search(path):
+        return False, ERR_INVALID_PATH
     return True, None
 
 if __name__ == '__main__':
+    # Werkzeug の開発用サーバーは開発環境でのみ使用する
+    # 本番環境は uwsgi --ini uwsgi.ini（CPUコア数分のプロセス × 16スレッド）で起動する
+    if os.environ.get('ENV') != 'dev':
+        logger.error("開発用サーバーは ENV=dev の場合のみ起動できます。uwsgi --ini uwsgi.ini で起動してください")
+        raise SystemExit(1)
     app.run()
@@ -5,14 +5,24 @@ Collects and posts AI-related news to Teams channel via webhook
 """
 
 import os
+import functools
 import json
-import pytz
+import logging
+import hashlib
+import time
 import feedparser
+import orjson
 import requests
 import re
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, islice
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
 from typing import List, Dict
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from pathlib import Path
 from dateutil import parser
 
 # Import setup_logger from util.log
@@ -21,15 +31,30 @@ from util.log import setup_logger
 # Setup logging
 logger = setup_logger(__name__)
 
+# Cache directory next to this script (/app/app/cache in the container, mounted as a volume)
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+
 # Configuration
 @dataclass
 class Config:
-    """Configuration settings"""
-    teams_webhook_url: str = os.getenv("TEAMS_WEBHOOK_URL", "")
-    llm_endpoint: str = os.getenv("LLM_ENDPOINT", "http://192.168.131.193:8008/v1/chat/completions")
-    llm_model: str = os.getenv("LLM_MODEL", "gpt-3.5-turbo")
-    max_news_items: int = int(os.getenv("MAX_NEWS_ITEMS", "3"))
-    dry_run: bool = os.getenv("DRY_RUN", "false").lower() == "true"
+    """Configuration settings (environment variables are read when an instance is created)"""
+    teams_webhook_url: str = field(default_factory=lambda: os.getenv("TEAMS_WEBHOOK_URL", ""))
+    llm_endpoint: str = field(default_factory=lambda: os.getenv("LLM_ENDPOINT", "http://192.168.131.193:8008/v1/chat/completions"))
+    llm_model: str = field(default_factory=lambda: os.getenv("LLM_MODEL", "gpt-3.5-turbo"))
+    max_news_items: int = field(default_factory=lambda: int(os.getenv("MAX_NEWS_ITEMS", "3")))
+    dry_run: bool = field(default_factory=lambda: os.getenv("DRY_RUN", "false").lower() == "true")
+    hours_back: int = field(default_factory=lambda: int(os.getenv("HOURS_BACK", "3")))  # 何時間前までの記事を取得するか
+    max_entries_per_feed: int = field(default_factory=lambda: int(os.getenv("MAX_ENTRIES_PER_FEED", "30")))  # 各フィードから取得する最大記事数
+    max_articles_to_llm: int = field(default_factory=lambda: int(os.getenv("MAX_ARTICLES_TO_LLM", "40")))  # LLMに送る記事数の上限
+    llm_cache_dir: str = field(default_factory=lambda: os.getenv("LLM_CACHE_DIR", CACHE_DIR))
+    feed_cache_file: str = field(default_factory=lambda: os.getenv("FEED_CACHE_FILE", os.path.join(CACHE_DIR, "feed_cache.json")))  # 空で条件付きGETを無効化
+    # 1日1回の実行に合わせ、同じ日の再実行（投稿失敗後のやり直しなど）で選定結果を使い回す。0 でキャッシュ無効
+    llm_cache_ttl_hours: int = field(default_factory=lambda: int(os.getenv("LLM_CACHE_TTL_HOURS", "24")))
+
+@functools.lru_cache(maxsize=1)
+def get_config() -> Config:
+    """Return the process-wide configuration (parsed from the environment once)"""
+    return Config()
 
 # RSS Feed Sources - Japanese AI/Tech News
 RSS_FEEDS = [
@@ -49,41 +74,223 @@ RSS_FEEDS = [
     ("Zenn トレンド", "https://zenn.dev/feed"),
 ]
 
+# HTTPタイムアウト（接続, 読み取り）秒。接続の詰まりと応答待ちを区別する
+LLM_TIMEOUT = (5, 30)
+WEBHOOK_TIMEOUT = (5, 10)
+
+# 統計がないフィード用（読み取り専用）
+_EMPTY_STATS = {'total_fetched': 0, 'recent_count': 0}
+
+# 日本時間（毎回タイムゾーンを引かないようモジュールで保持する）
+_JST = ZoneInfo('Asia/Tokyo')
+
+# 記事サマリーの整形用（HTMLタグと連続する空白）
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# カテゴリごとの絵文字（キー同士は部分文字列の関係にないため、完全一致を先に引ける）
+_CATEGORY_EMOJI = {
+    "SLM/VLM": "🤖",
+    "AI Coding Agent": "💻",
+    "AI Agent": "🔧",
+    "AIセキュリティ": "🔒",
+    "Python": "🐍",
+    "TypeScript": "📘",
+    "音声認識": "🎤",
+    "OCR": "👁️",
+}
+_CATEGORY_EMOJI_ITEMS = tuple(_CATEGORY_EMOJI.items())
+
+def category_to_emoji(category: str) -> str:
+    """Return the emoji for a category (exact match first, then substring match)"""
+    emoji = _CATEGORY_EMOJI.get(category)
+    if emoji:
+        return emoji
+    for key, value in _CATEGORY_EMOJI_ITEMS:
+        if key in category:
+            return value
+    return "📰"
+
+# RSS 2.0 (RFC 822) と Atom (ISO 8601) でよく使われる日時フォーマット
+_DATE_FORMATS = (
+    "%a, %d %b %Y %H:%M:%S %z",
+    "%Y-%m-%dT%H:%M:%S%z",
+    "%Y-%m-%dT%H:%M:%S.%f%z",
+)
+
+def parse_published(published_str: str) -> datetime:
+    """Parse a feed date string (strptime fast path, falls back to dateutil)"""
+    value = published_str.strip()
+    # strptime の %Z はタイムゾーンなしの datetime を返すため、数値オフセットに置き換える
+    if value.endswith((" GMT", " UTC")):
+        value = value[:-4] + " +0000"
+    for date_format in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            pass
+    return parser.parse(published_str)
+
+# LLMに記事を選ばせるプロンプト（{article_list} と {max_n} を埋めて使う）
+_PROMPT_TEMPLATE = """以下の記事リストから、AIコンサルタント・弁護士向けに特に関連性の高いニュースを選んでください。
+
+優先度の高いカテゴリ（専門性重視）:
+1. 【最優先】法務・コンプライアンス関連
+   - AI規制・ガバナンス（EU AI Act、日本のAIガイドライン改訂など）
+   - 個人情報保護（APPI、GDPR）・プライバシー関連の動向
+   - クラウドセキュリティ認証（ISO27001、ISMAP、SOC2、FedRAMP）の更新
+   - セキュリティインシデント・脆弱性（CVE、データ漏洩、不正アクセス、サプライチェーン攻撃）
+   - 法律業界でのAI活用事例（契約書レビュー、法的文書自動生成、判例検索）   
+
+2. 【高優先】実務に直結するAIツール・技術
+   - 業務における生成AI活用の具体的事例
+   - ローカル生成 AI（SLM/VLM/OCR/音声認識等）の新機能・精度向上・比較
+   - Claude Code、MCPなどAI開発支援ツールの更新・Tips
+   - AIエージェント評価・統合ツール（Dify、n8n、LangGraph、CrewAI）
+
+3. 【高優先】SLM（小規模言語モデル）の進化
+   - 軽量・高速・省電力なAIモデル（Phi、Gemma、富士通Takane、NEC cotomi、Qwen等）
+   - エッジデバイスでのAI実行技術
+   - 特定タスク特化型モデル（法務、医療、金融向け）
+
+4. 【中優先】インフラ・開発環境
+   - Docker、WSL2、Dev Container関連の重要更新
+   - GPU最適化・クラウドコンピューティング（AWS、Azure、GCP）
+   - Teams、Slack等のコラボツール（特に法律事務所・テレワーク活用）
+   - Git/GitHub、テスト自動化（Playwright等）の新機能
+
+5. 【参考】技術スタック関連
+   - Python、Flask、FastAPI、Uvicornの重要更新
+   - Elasticsearch、MySQLの新機能・セキュリティ更新
+   - Nginx、Llama.cppの最適化技術
+
+記事リスト:
+{article_list}
+
+選択基準（重要度順）:
+1. 法的リスク・コンプライアンスへの影響がある
+2. 法律事務所・コンサル業務の効率化に直結する
+3. 具体的な製品名・バージョン・実装例が明記されている
+4. 1か月以内に導入・検証可能な実用的な内容
+
+最大{max_n}個の記事を選んで返してください。"""
+
 class NewsCollector:
     """Collects news from various RSS feeds"""
 
-    def __init__(self, feeds: List[tuple], hours_back: int = 3, max_entries_per_feed: int = 30):
+    def __init__(self, feeds: List[tuple], hours_back: int = 3, max_entries_per_feed: int = 30,
+                 max_workers: int = 8, fetch_timeout: tuple = (5, 15), cache_file: str = ""):
         self.feeds = feeds
         self.hours_back = hours_back  # 何時間前までの記事を取得するか
         self.max_entries_per_feed = max_entries_per_feed  # 各フィードから取得する最大記事数
+        self.max_workers = max_workers  # フィードを同時に取得する最大数
+        self.fetch_timeout = fetch_timeout  # 各フィード取得のタイムアウト（接続, 読み取り）秒
+        self.cache_file = cache_file  # ETag/Last-Modified の保存先（空なら条件付きGETをしない）
+        self.feed_cache = self.load_feed_cache()
+
+    def load_feed_cache(self) -> Dict[str, Dict]:
+        """Load the per-feed ETag/Last-Modified values saved by the previous run"""
+        if not self.cache_file:
+            return {}
+        try:
+            return orjson.loads(Path(self.cache_file).read_bytes())
+        except (OSError, orjson.JSONDecodeError):
+            return {}
+
+    def save_feed_cache(self):
+        """Save the per-feed ETag/Last-Modified values for the next run (call only after a successful publish)"""
+        if not self.cache_file:
+            return
+        try:
+            cache_path = Path(self.cache_file)
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            cache_path.write_bytes(orjson.dumps(self.feed_cache))
+        except OSError as e:
+            logger.warning(f"Could not write feed cache: {e}")
+
+    def download_feed(self, session: requests.Session, feed_url: str):
+        """Download a single feed and parse it with feedparser (None if not modified)"""
+        headers = {"User-Agent": feedparser.USER_AGENT}
+        # 前回の ETag/Last-Modified を送り、変更がなければ本文なしの 304 を受け取る
+        validators = self.feed_cache.get(feed_url, {})
+        if validators.get('etag'):
+            headers["If-None-Match"] = validators['etag']
+        if validators.get('modified'):
+            headers["If-Modified-Since"] = validators['modified']
+        response = session.get(
+            feed_url,
+            headers=headers,
+            timeout=self.fetch_timeout
+        )
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+        if self.cache_file:
+            self.feed_cache[feed_url] = {
+                'etag': response.headers.get('ETag', ''),
+                'modified': response.headers.get('Last-Modified', '')
+            }
+        # 文字コード判定と相対URL解決のため、レスポンスヘッダーも feedparser に渡す
+        response_headers = {k.lower(): v for k, v in response.headers.items()}
+        response_headers['content-location'] = response.url
+        return feedparser.parse(response.content, response_headers=response_headers)
+
+    def download_feeds(self) -> List:
+        """Download all feeds concurrently (results are in the same order as self.feeds)"""
+        with requests.Session() as session:
+            adapter = HTTPAdapter(pool_connections=len(self.feeds), pool_maxsize=self.max_workers)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [executor.submit(self.download_feed, session, feed_url) for _, feed_url in self.feeds]
+                feeds = [future.exception() or future.result() for future in futures]
+        return feeds
 
     def fetch_articles(self) -> List[Dict]:
         """Fetch articles from all configured RSS feeds"""
-        all_articles = []
+        # 収集時点でタイトルの重複を除く（先に取得したフィードの記事を優先）
+        articles_by_title: Dict[str, Dict] = {}
+        duplicate_count = 0
 
         # 現在時刻から指定時間前までを取得対象とする
-        jst = pytz.timezone('Asia/Tokyo')
-        cutoff_time = datetime.now(jst) - timedelta(hours=self.hours_back)
+        cutoff_time = datetime.now(_JST) - timedelta(hours=self.hours_back)
+        # 記事ごとの比較はPOSIXタイムスタンプ同士で行う
+        cutoff_ts = cutoff_time.timestamp()
+        # feedparser の published_parsed（UTCの struct_time）とはタプルのまま比較する
+        cutoff_struct = tuple(cutoff_time.utctimetuple()[:6])
 
         # 各フィードの統計を保存
         feed_stats = {}
 
-        for source_name, feed_url in self.feeds:
+        # ネットワーク待ちが大半なので、全フィードを並列に取得してから順に処理する
+        feeds = self.download_feeds()
+
+        for (source_name, feed_url), feed in zip(self.feeds, feeds):
             try:
                 logger.info(f"Fetching from {source_name}...")
-                feed = feedparser.parse(feed_url)
+                if isinstance(feed, Exception):
+                    raise feed
+                if feed is None:
+                    # 304 Not Modified: 前回から記事に変化がないので処理しない
+                    logger.info(f"  {source_name} not modified since last run")
+                    feed_stats[source_name] = {
+                        'total_fetched': 0,
+                        'recent_count': 0
+                    }
+                    continue
                 articles_added = 0
 
-                # ① 各RSS_FEEDから取得した生データをログ出力
+                # ① 各RSS_FEEDから取得した生データをログ出力（サンプル記事の全文はDEBUG時のみ）
+                debug_enabled = logger.isEnabledFor(logging.DEBUG)
                 logger.info(f"  Raw feed data from {source_name}:")
                 logger.info(f"    Feed entries count: {len(feed.entries)}")
-                if len(feed.entries) > 0:
-                    logger.info(f"    Sample entry (first): {json.dumps(dict(feed.entries[0]), indent=2, default=str, ensure_ascii=False)[:1000]}...")
+                if debug_enabled and len(feed.entries) > 0:
+                    logger.debug(f"    Sample entry (first): {json.dumps(dict(feed.entries[0]), indent=2, default=str, ensure_ascii=False)[:1000]}...")
 
                 total_in_feed = 0  # フィードから取得した総記事数
                 recent_count = 0   # 指定時間内の記事数
 
-                for entry in feed.entries[:self.max_entries_per_feed]:  # 環境変数で制御
+                for entry in islice(feed.entries, self.max_entries_per_feed):  # 環境変数で制御
                     total_in_feed += 1
                     # 公開日時のパース
                     published_str = entry.get("published", "")
@@ -92,27 +299,41 @@ class NewsCollector:
                         continue
 
                     try:
-                        published_dt = parser.parse(published_str)
-                        if published_dt.tzinfo is None:
-                            published_dt = jst.localize(published_dt)
-
-                        # 指定時間より古い記事はスキップ
-                        if published_dt < cutoff_time:
-                            continue
+                        published_parsed = entry.get("published_parsed")
+                        if published_parsed:
+                            # feedparser がUTCで解析済みの日時をそのままタプル比較し、文字列の再パースを省く
+                            if published_parsed[:6] < cutoff_struct:
+                                continue
+                        else:
+                            published_dt = parse_published(published_str)
+                            if published_dt.tzinfo is None:
+                                published_dt = published_dt.replace(tzinfo=_JST)
+                            # 指定時間より古い記事はスキップ
+                            if published_dt.timestamp() < cutoff_ts:
+                                continue
                     except:
                         continue  # パースできない場合は含めない
 
-                    article = {
-                        "title": entry.get("title", ""),
+                    recent_count += 1
+                    title = entry.get("title", "")
+                    if debug_enabled:
+                        logger.debug(f'{title=}, {entry.get("link", "")=}, {source_name=}, {published_str=}')
+                    # 重複タイトルは記事データを組み立てる前に除く
+                    title_key = title.strip()
+                    if not title_key or title_key in articles_by_title:
+                        duplicate_count += 1
+                        continue
+
+                    # 必要なフィールドだけを一度ずつ取り出す（本文は500文字に切り詰めるので summary のみ参照）
+                    summary = entry.get("summary")
+                    articles_by_title[title_key] = {
+                        "title": title,
                         "url": entry.get("link", ""),
                         "source": source_name,
                         "published": published_str,
-                        "summary": entry.get("summary", "")[:500] if entry.get("summary") else ""
+                        "summary": summary[:500] if summary else ""
                     }
-                    logger.info(f'{article["title"]=}, {article["url"]=}, {article["source"]=}, {article["published"]=}')
-                    all_articles.append(article)
                     articles_added += 1
-                    recent_count += 1
 
                 logger.info(f"  Fetched {articles_added} articles from {source_name} (last {self.hours_back} hours)")
 
@@ -128,6 +349,9 @@ class NewsCollector:
                     'recent_count': 0
                 }
 
+        all_articles = list(articles_by_title.values())
+        logger.info(f"Removed {duplicate_count} duplicate articles based on title")
+
         # Log summary of articles collected per source
         logger.info("=" * 60)
         logger.info("ARTICLES COLLECTED PER SOURCE:")
@@ -154,6 +378,55 @@ class NewsFilter:
 
     def __init__(self, config: Config):
         self.config = config
+        # LLM エンドポイントへの接続は Session で使い回す
+        self._session = requests.Session()
+
+    def selection_cache_path(self, llm_articles: List[Dict]) -> Path:
+        """Return the cache file for an LLM selection (keyed by model, sorted titles and max items)"""
+        titles = "\n".join(sorted(art['title'] for art in llm_articles))
+        key = hashlib.sha256(
+            f"{self.config.llm_model}|{titles}|{self.config.max_news_items}".encode("utf-8")
+        ).hexdigest()
+        return Path(self.config.llm_cache_dir) / f"{key}.json"
+
+    def load_cached_selection(self, cache_path: Path, llm_articles: List[Dict]):
+        """Load a cached LLM selection, renumbered for the current article order (None on miss)"""
+        if self.config.llm_cache_ttl_hours <= 0:
+            return None
+        try:
+            if time.time() - cache_path.stat().st_mtime > self.config.llm_cache_ttl_hours * 3600:
+                return None
+            cached = orjson.loads(cache_path.read_bytes())
+        except (OSError, orjson.JSONDecodeError):
+            return None
+
+        # キャッシュはタイトルで保存しているので、今回のリストでの番号に振り直す
+        numbers = {art['title']: i for i, art in enumerate(llm_articles, 1)}
+        selected = []
+        for item in cached:
+            number = numbers.get(item.pop('title', None))
+            if number is not None:
+                item['number'] = number
+                selected.append(item)
+        logger.info(f"Using cached LLM selection: {cache_path.name}")
+        return selected
+
+    def store_cached_selection(self, cache_path: Path, llm_articles: List[Dict], selected: List[Dict]):
+        """Save an LLM selection to the cache (article numbers are stored as titles)"""
+        if self.config.llm_cache_ttl_hours <= 0:
+            return
+        cached = []
+        for item in selected:
+            idx = item.get('number', 0) - 1
+            if 0 <= idx < len(llm_articles):
+                entry = {k: v for k, v in item.items() if k != 'number'}
+                entry['title'] = llm_articles[idx]['title']
+                cached.append(entry)
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            cache_path.write_bytes(orjson.dumps(cached))
+        except OSError as e:
+            logger.warning(f"Could not write LLM selection cache: {e}")
 
     def filter_articles(self, articles: List[Dict]) -> List[Dict]:
         """Filter articles using LLM for relevance"""
@@ -161,77 +434,25 @@ class NewsFilter:
         if not articles:
             return []
 
-        # Remove duplicate titles
-        seen_titles = set()
-        unique_articles = []
-        for article in articles:
-            title = article.get('title', '').strip()
-            if title and title not in seen_titles:
-                seen_titles.add(title)
-                unique_articles.append(article)
-
-        logger.info(f"Removed {len(articles) - len(unique_articles)} duplicate articles based on title")
-        articles = unique_articles
-
         # LLMに送る記事数の上限（環境変数で設定可能、デフォルト40）
-        max_articles_to_llm = int(os.getenv('MAX_ARTICLES_TO_LLM', '40'))
+        llm_articles = articles[:self.config.max_articles_to_llm]
+        len_cap = len(llm_articles)
 
         # Prepare article list for LLM
-        article_list = "\n".join([
-            f"{i+1}. {art['title']} (from {art['source']})"
-            for i, art in enumerate(articles[:max_articles_to_llm])  # Limit to prevent context overflow
-        ])
-
-        # ② LLMに送信するプロンプト（全文）をログ出力
-        prompt = f"""以下の記事リストから、AIコンサルタント・弁護士向けに特に関連性の高いニュースを選んでください。
-
-優先度の高いカテゴリ（専門性重視）:
-1. 【最優先】法務・コンプライアンス関連
-   - AI規制・ガバナンス（EU AI Act、日本のAIガイドライン改訂など）
-   - 個人情報保護（APPI、GDPR）・プライバシー関連の動向
-   - クラウドセキュリティ認証（ISO27001、ISMAP、SOC2、FedRAMP）の更新
-   - セキュリティインシデント・脆弱性（CVE、データ漏洩、不正アクセス、サプライチェーン攻撃）
-   - 法律業界でのAI活用事例（契約書レビュー、法的文書自動生成、判例検索）   
-
-2. 【高優先】実務に直結するAIツール・技術
-   - 業務における生成AI活用の具体的事例
-   - ローカル生成 AI（SLM/VLM/OCR/音声認識等）の新機能・精度向上・比較
-   - Claude Code、MCPなどAI開発支援ツールの更新・Tips
-   - AIエージェント評価・統合ツール（Dify、n8n、LangGraph、CrewAI）
+        article_list = "\n".join(
+            f"{i}. {art['title']} (from {art['source']})"
+            for i, art in enumerate(llm_articles, 1)  # Limit to prevent context overflow
+        )
 
-3. 【高優先】SLM（小規模言語モデル）の進化
-   - 軽量・高速・省電力なAIモデル（Phi、Gemma、富士通Takane、NEC cotomi、Qwen等）
-   - エッジデバイスでのAI実行技術
-   - 特定タスク特化型モデル（法務、医療、金融向け）
+        prompt = _PROMPT_TEMPLATE.format(article_list=article_list, max_n=self.config.max_news_items)
 
-4. 【中優先】インフラ・開発環境
-   - Docker、WSL2、Dev Container関連の重要更新
-   - GPU最適化・クラウドコンピューティング（AWS、Azure、GCP）
-   - Teams、Slack等のコラボツール（特に法律事務所・テレワーク活用）
-   - Git/GitHub、テスト自動化（Playwright等）の新機能
-
-5. 【参考】技術スタック関連
-   - Python、Flask、FastAPI、Uvicornの重要更新
-   - Elasticsearch、MySQLの新機能・セキュリティ更新
-   - Nginx、Llama.cppの最適化技術
-
-記事リスト:
-{article_list}
-
-選択基準（重要度順）:
-1. 法的リスク・コンプライアンスへの影響がある
-2. 法律事務所・コンサル業務の効率化に直結する
-3. 具体的な製品名・バージョン・実装例が明記されている
-4. 1か月以内に導入・検証可能な実用的な内容
-
-最大{self.config.max_news_items}個の記事を選んで返してください。"""
-
-        # LLMに送信するプロンプト全文をログ出力
-        logger.info("="*80)
-        logger.info("LLM REQUEST - Full Prompt:")
-        logger.info("="*80)
-        logger.info(prompt)
-        logger.info("="*80)
+        # ② LLMに送信するプロンプト全文をログ出力（固定文が大半なのでDEBUG時のみ）
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("="*80)
+            logger.debug("LLM REQUEST - Full Prompt:")
+            logger.debug("="*80)
+            logger.debug(prompt)
+            logger.debug("="*80)
 
         # Define JSON schema for structured output
         json_schema = {
@@ -255,98 +476,103 @@ class NewsFilter:
         }
 
         try:
-            response = requests.post(
-                self.config.llm_endpoint,
-                headers={
-                    "Content-Type": "application/json",
-                    "Authorization": "Bearer no-key"
-                },
-                json={
-                    "model": self.config.llm_model,
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": "You are an AI news curator specializing in development tools and AI technologies. Focus on practical, immediately useful information for SaaS development teams."
-                        },
-                        {"role": "user", "content": prompt}
-                    ],
-                    "temperature": 0.3,
-                    "max_tokens": 3000,
-                    "response_format": {
-                        "type": "json_object",
-                        "schema": json_schema
-                    }
-                },
-                timeout=30
-            )
+            # 同じ記事の組み合わせを直近にLLMで評価済みなら、その結果を再利用する
+            cache_path = self.selection_cache_path(llm_articles)
+            filtered_indices = self.load_cached_selection(cache_path, llm_articles)
+            if filtered_indices is None:
+                response = self._session.post(
+                    self.config.llm_endpoint,
+                    headers={
+                        "Content-Type": "application/json",
+                        "Authorization": "Bearer no-key"
+                    },
+                    data=orjson.dumps({
+                        "model": self.config.llm_model,
+                        "messages": [
+                            {
+                                "role": "system",
+                                "content": "You are an AI news curator specializing in development tools and AI technologies. Focus on practical, immediately useful information for SaaS development teams."
+                            },
+                            {"role": "user", "content": prompt}
+                        ],
+                        "temperature": 0.3,
+                        "max_tokens": 3000,
+                        "response_format": {
+                            "type": "json_object",
+                            "schema": json_schema
+                        }
+                    }),
+                    timeout=LLM_TIMEOUT
+                )
 
-            if response.status_code == 200:
-                result = response.json()
+                if response.status_code != 200:
+                    logger.error(f"LLM Error: {response.status_code} - {response.text}")
+                    return articles[:self.config.max_news_items]
+
+                result = orjson.loads(response.content)
 
                 # ③ LLMから取得したデータ（全文）をログ出力
                 logger.info("="*80)
                 logger.info("LLM RESPONSE - Full Response:")
                 logger.info("="*80)
-                logger.info(json.dumps(result, indent=2, ensure_ascii=False))
+                logger.info(orjson.dumps(result, option=orjson.OPT_INDENT_2).decode())
                 logger.info("="*80)
 
                 content = result['choices'][0]['message']['content']
 
-                parsed_response = json.loads(content)
+                parsed_response = orjson.loads(content)
                 filtered_indices = parsed_response.get('selected_articles', [])
-
-                # Sort by relevance score
-                filtered_indices.sort(key=lambda x: x.get('relevance_score', 0), reverse=True)
-
-                # Map back to original articles
-                filtered_articles = []
-                for item in filtered_indices[:self.config.max_news_items]:
-                    idx = item['number'] - 1
-                    if 0 <= idx < len(articles[:max_articles_to_llm]):
-                        article = articles[idx].copy()
-                        article['relevance_score'] = item.get('relevance_score', 0)
-                        article['category'] = item.get('category', 'General')
-                        article['reason'] = item.get('reason', '')
-                        filtered_articles.append(article)
-
-                logger.info(f"Filtered to {len(filtered_articles)} relevant articles")
-
-                # ④ サマリー（②で実際に送られた記事の詳細）
+                self.store_cached_selection(cache_path, llm_articles, filtered_indices)
+
+            # Sort by relevance score
+            filtered_indices.sort(key=lambda x: x.get('relevance_score', 0), reverse=True)
+
+            # Map back to original articles
+            filtered_articles = []
+            for item in filtered_indices[:self.config.max_news_items]:
+                idx = item['number'] - 1
+                if 0 <= idx < len_cap:
+                    article = articles[idx].copy()
+                    article['relevance_score'] = item.get('relevance_score', 0)
+                    article['category'] = item.get('category', 'General')
+                    article['reason'] = item.get('reason', '')
+                    filtered_articles.append(article)
+
+            logger.info(f"Filtered to {len(filtered_articles)} relevant articles")
+
+            # ④ サマリー（②で実際に送られた記事の詳細）
+            logger.info("")
+            logger.info("="*80)
+            logger.info("FILTERING SUMMARY:")
+            logger.info("="*80)
+            logger.info(f"  Articles sent to LLM for evaluation: {len_cap}")
+            logger.info(f"  Articles selected by LLM: {len(filtered_articles)}")
+            logger.info("")
+            logger.info("  Selected articles detail:")
+            logger.info("  " + "-"*50)
+
+            # 選択された記事をソース別に集計
+            selected_by_source = {}
+            for article in filtered_articles:
+                source = article['source']
+                if source not in selected_by_source:
+                    selected_by_source[source] = []
+                selected_by_source[source].append(article)
+
+            for i, article in enumerate(filtered_articles, 1):
+                logger.info(f"  {i}. [{article.get('category', 'N/A'):15}] Score: {article.get('relevance_score', 0):.2f}")
+                logger.info(f"     Title: {article['title'][:80]}..." if len(article['title']) > 80 else f"     Title: {article['title']}")
+                logger.info(f"     Source: {article['source']}")
+                logger.info(f"     Reason: {article.get('reason', 'N/A')[:100]}..." if len(article.get('reason', '')) > 100 else f"     Reason: {article.get('reason', 'N/A')}")
                 logger.info("")
-                logger.info("="*80)
-                logger.info("FILTERING SUMMARY:")
-                logger.info("="*80)
-                logger.info(f"  Articles sent to LLM for evaluation: {len(articles[:max_articles_to_llm])}")
-                logger.info(f"  Articles selected by LLM: {len(filtered_articles)}")
-                logger.info("")
-                logger.info("  Selected articles detail:")
-                logger.info("  " + "-"*50)
-
-                # 選択された記事をソース別に集計
-                selected_by_source = {}
-                for article in filtered_articles:
-                    source = article['source']
-                    if source not in selected_by_source:
-                        selected_by_source[source] = []
-                    selected_by_source[source].append(article)
-
-                for i, article in enumerate(filtered_articles, 1):
-                    logger.info(f"  {i}. [{article.get('category', 'N/A'):15}] Score: {article.get('relevance_score', 0):.2f}")
-                    logger.info(f"     Title: {article['title'][:80]}..." if len(article['title']) > 80 else f"     Title: {article['title']}")
-                    logger.info(f"     Source: {article['source']}")
-                    logger.info(f"     Reason: {article.get('reason', 'N/A')[:100]}..." if len(article.get('reason', '')) > 100 else f"     Reason: {article.get('reason', 'N/A')}")
-                    logger.info("")
-
-                logger.info("  " + "-"*50)
-                logger.info("  Selected articles by source:")
-                for source_name, articles in selected_by_source.items():
-                    logger.info(f"    {source_name}: {len(articles)} articles")
-                logger.info("="*80)
 
-                return filtered_articles
+            logger.info("  " + "-"*50)
+            logger.info("  Selected articles by source:")
+            for source_name, articles in selected_by_source.items():
+                logger.info(f"    {source_name}: {len(articles)} articles")
+            logger.info("="*80)
 
-            else:
-                logger.error(f"LLM Error: {response.status_code} - {response.text}")
+            return filtered_articles
 
         except Exception as e:
             logger.error(f"Error filtering articles: {e}")
@@ -359,6 +585,20 @@ class TeamsPublisher:
 
     def __init__(self, config: Config):
         self.config = config
+        # Webhook への投稿は keep-alive で接続を使い回し、一時的なエラーは再試行する
+        self._session = requests.Session()
+        # カードは orjson でシリアライズした bytes を data= で送る
+        self._session.headers["Content-Type"] = "application/json"
+        # POST は冪等でないため、Teams が受け付けた可能性のある 500/504 や応答待ちのタイムアウトは再試行しない（二重投稿を防ぐ）
+        retry = Retry(
+            total=2,
+            read=0,
+            backoff_factor=0.3,
+            status_forcelist=[429, 502, 503],
+            allowed_methods=["POST"],
+            raise_on_status=False
+        )
+        self._session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=retry))
 
     def format_published_date(self, published_str: str) -> str:
         """Format published date to YY/MM/DD HH:mm format"""
@@ -366,7 +606,7 @@ class TeamsPublisher:
             return ""
         try:
             # Parse the date string
-            dt = parser.parse(published_str)
+            dt = parse_published(published_str)
             # Format to YY/MM/DD HH:mm
             return dt.strftime("%y/%m/%d %H:%M")
         except:
@@ -376,37 +616,7 @@ class TeamsPublisher:
     def create_news_card(self, article: Dict, index: int) -> Dict:
         """Create an Adaptive Card for a news article"""
 
-        # Emoji mapping for categories
-        category_emoji = {
-            "SLM/VLM": "🤖",
-            "AI Coding Agent": "💻",
-            "AI Agent": "🔧",
-            "AIセキュリティ": "🔒",
-            "Python": "🐍",
-            "TypeScript": "📘",
-            "音声認識": "🎤",
-            "OCR": "👁️",
-        }
-
-        # Find matching emoji
-        emoji = "📰"
-        for key, value in category_emoji.items():
-            if key in article.get('category', ''):
-                emoji = value
-                break
-
-        # Format score as stars
-        score = article.get('relevance_score', 0)
-        if score >= 0.9:
-            stars = "⭐⭐⭐⭐⭐"
-        elif score >= 0.8:
-            stars = "⭐⭐⭐⭐"
-        elif score >= 0.7:
-            stars = "⭐⭐⭐"
-        elif score >= 0.5:
-            stars = "⭐⭐"
-        else:
-            stars = "⭐"
+        emoji = category_to_emoji(article.get('category', ''))
 
         return {
             "type": "message",
@@ -488,8 +698,7 @@ class TeamsPublisher:
     def post_summary_card(self, total_articles: int, filtered_count: int) -> bool:
         """Post a summary card with today's statistics"""
 
-        jst = pytz.timezone('Asia/Tokyo')
-        now = datetime.now(jst)
+        now = datetime.now(_JST)
         today = now.strftime("%Y-%m-%d %H:%M")
 
         card = {
@@ -533,10 +742,10 @@ class TeamsPublisher:
             return True
 
         try:
-            response = requests.post(
+            response = self._session.post(
                 self.config.teams_webhook_url,
-                json=card,
-                timeout=10
+                data=orjson.dumps(card),
+                timeout=WEBHOOK_TIMEOUT
             )
 
             return response.status_code in [200, 202, 1]
@@ -545,8 +754,10 @@ class TeamsPublisher:
             logger.error(f"Error posting summary: {e}")
             return False
 
+    # deprecated: use publish_news（全記事を1枚のカードにまとめて1回で投稿する）
     def post_article(self, article: Dict, index: int) -> bool:
-        """Post a single article to Teams"""
+        """Post a single article to Teams (deprecated: use publish_news)"""
+        logger.debug("post_article is deprecated; use publish_news")
 
         card = self.create_news_card(article, index)
 
@@ -555,10 +766,10 @@ class TeamsPublisher:
             return True
 
         try:
-            response = requests.post(
+            response = self._session.post(
                 self.config.teams_webhook_url,
-                json=card,
-                timeout=10
+                data=orjson.dumps(card),
+                timeout=WEBHOOK_TIMEOUT
             )
 
             if response.status_code in [200, 202, 1]:
@@ -572,11 +783,113 @@ class TeamsPublisher:
             logger.error(f"Error posting article: {e}")
             return False
 
+    def create_article_sections(self, article: Dict, i: int, is_last: bool) -> List[Dict]:
+        """Create the Adaptive Card body elements for one article of the combined card"""
+        emoji = category_to_emoji(article.get('category', ''))
+
+        # Article header (title + category/date/source)
+        sections = [
+            {
+                "type": "TextBlock",
+                "text": f"{emoji} #{i} {article['title']}",
+                "size": "Medium",
+                "weight": "Bolder",
+                "wrap": True,
+                "color": "Accent"
+            },
+            {
+                "type": "ColumnSet",
+                "columns": [
+                    {
+                        "type": "Column",
+                        "width": "auto",
+                        "items": [
+                            {
+                                "type": "TextBlock",
+                                "text": f"📂 {article.get('category', 'General')}",
+                                "size": "Small",
+                                "color": "Good"
+                            }
+                        ]
+                    },
+                    {
+                        "type": "Column",
+                        "width": "auto",
+                        "items": [
+                            {
+                                "type": "TextBlock",
+                                "text": self.format_published_date(article.get('published', '')),
+                                "size": "Small"
+                            }
+                        ]
+                    },
+                    {
+                        "type": "Column",
+                        "width": "stretch",
+                        "items": [
+                            {
+                                "type": "TextBlock",
+                                "text": f"{article['source']}",
+                                "size": "Small",
+                                "color": "Attention"
+                            }
+                        ]
+                    }
+                ]
+            }
+        ]
+
+        # Add summary if available
+        summary_text = article.get('summary', '').strip()
+        if summary_text:
+            # Remove HTML tags
+            summary_text = _HTML_TAG_RE.sub('', summary_text)
+            # Remove multiple spaces and newlines
+            summary_text = _WHITESPACE_RE.sub(' ', summary_text).strip()
+
+            # Limit summary length and add ellipsis if truncated
+            max_length = 200
+            if len(summary_text) > max_length:
+                summary_text = summary_text[:max_length] + "..."
+
+            # Only add if there's still content after cleaning
+            if summary_text:
+                sections.append({
+                    "type": "TextBlock",
+                    "text": summary_text,
+                    "wrap": True,
+                    "size": "Small",
+                    "isSubtle": True,
+                    "spacing": "Small"
+                })
+
+        # Add action button
+        sections.append({
+            "type": "ActionSet",
+            "actions": [
+                {
+                    "type": "Action.OpenUrl",
+                    "title": f"記事を読む 🔗",
+                    "url": article['url']
+                }
+            ]
+        })
+
+        # Add separator between articles (except for last one)
+        if not is_last:
+            sections.append({
+                "type": "TextBlock",
+                "text": "",
+                "separator": True,
+                "spacing": "Medium"
+            })
+
+        return sections
+
     def create_combined_news_card(self, articles: List[Dict], total_collected: int) -> Dict:
         """Create a single Adaptive Card containing all news articles"""
 
-        jst = pytz.timezone('Asia/Tokyo')
-        now = datetime.now(jst)
+        now = datetime.now(_JST)
         today = now.strftime("%Y-%m-%d %H:%M")
 
         # Create body sections for all articles
@@ -610,136 +923,12 @@ class TeamsPublisher:
             }
         ]
 
-        # Add each article to the card
-        for i, article in enumerate(articles, 1):
-            # Emoji mapping for categories
-            category_emoji = {
-                "SLM/VLM": "🤖",
-                "AI Coding Agent": "💻",
-                "AI Agent": "🔧",
-                "AIセキュリティ": "🔒",
-                "Python": "🐍",
-                "TypeScript": "📘",
-                "音声認識": "🎤",
-                "OCR": "👁️",
-            }
-
-            # Find matching emoji
-            emoji = "📰"
-            for key, value in category_emoji.items():
-                if key in article.get('category', ''):
-                    emoji = value
-                    break
-
-            # Format score as stars
-            score = article.get('relevance_score', 0)
-            if score >= 0.9:
-                stars = "⭐⭐⭐⭐⭐"
-            elif score >= 0.8:
-                stars = "⭐⭐⭐⭐"
-            elif score >= 0.7:
-                stars = "⭐⭐⭐"
-            elif score >= 0.5:
-                stars = "⭐⭐"
-            else:
-                stars = "⭐"
-
-            # Add article section
-            body_sections.extend([
-                {
-                    "type": "TextBlock",
-                    "text": f"{emoji} #{i} {article['title']}",
-                    "size": "Medium",
-                    "weight": "Bolder",
-                    "wrap": True,
-                    "color": "Accent"
-                },
-                {
-                    "type": "ColumnSet",
-                    "columns": [
-                        {
-                            "type": "Column",
-                            "width": "auto",
-                            "items": [
-                                {
-                                    "type": "TextBlock",
-                                    "text": f"📂 {article.get('category', 'General')}",
-                                    "size": "Small",
-                                    "color": "Good"
-                                }
-                            ]
-                        },
-                        {
-                            "type": "Column",
-                            "width": "auto",
-                            "items": [
-                                {
-                                    "type": "TextBlock",
-                                    "text": self.format_published_date(article.get('published', '')),
-                                    "size": "Small"
-                                }
-                            ]
-                        },
-                        {
-                            "type": "Column",
-                            "width": "stretch",
-                            "items": [
-                                {
-                                    "type": "TextBlock",
-                                    "text": f"{article['source']}",
-                                    "size": "Small",
-                                    "color": "Attention"
-                                }
-                            ]
-                        }
-                    ]
-                }
-            ])
-
-            # Add summary if available
-            summary_text = article.get('summary', '').strip()
-            if summary_text:
-                # Remove HTML tags
-                summary_text = re.sub(r'<[^>]+>', '', summary_text)
-                # Remove multiple spaces and newlines
-                summary_text = re.sub(r'\s+', ' ', summary_text).strip()
-
-                # Limit summary length and add ellipsis if truncated
-                max_length = 200
-                if len(summary_text) > max_length:
-                    summary_text = summary_text[:max_length] + "..."
-
-                # Only add if there's still content after cleaning
-                if summary_text:
-                    body_sections.append({
-                        "type": "TextBlock",
-                        "text": summary_text,
-                        "wrap": True,
-                        "size": "Small",
-                        "isSubtle": True,
-                        "spacing": "Small"
-                    })
-
-            # Add action button
-            body_sections.append({
-                "type": "ActionSet",
-                "actions": [
-                    {
-                        "type": "Action.OpenUrl",
-                        "title": f"記事を読む 🔗",
-                        "url": article['url']
-                    }
-                ]
-            })
-
-            # Add separator between articles (except for last one)
-            if i < len(articles):
-                body_sections.append({
-                    "type": "TextBlock",
-                    "text": "",
-                    "separator": True,
-                    "spacing": "Medium"
-                })
+        # Add each article to the card in one pass
+        last_index = len(articles)
+        body_sections.extend(chain.from_iterable(
+            self.create_article_sections(article, i, i == last_index)
+            for i, article in enumerate(articles, 1)
+        ))
 
         return {
             "type": "message",
@@ -754,16 +943,13 @@ class TeamsPublisher:
             }]
         }
 
-    def publish_news(self, articles: List[Dict], total_collected: int = None) -> int:
+    def publish_news(self, articles: List[Dict], total_collected: int) -> int:
         """Publish all news articles to Teams in a single message"""
 
         if not articles:
             logger.warning("No articles to publish")
             return 0
 
-        if total_collected is None:
-            total_collected = len(articles) * 3  # Fallback estimate
-
         # Create and post combined card
         combined_card = self.create_combined_news_card(articles, total_collected)
 
@@ -772,10 +958,10 @@ class TeamsPublisher:
             return len(articles)
 
         try:
-            response = requests.post(
+            response = self._session.post(
                 self.config.teams_webhook_url,
-                json=combined_card,
-                timeout=10
+                data=orjson.dumps(combined_card),
+                timeout=WEBHOOK_TIMEOUT
             )
 
             if response.status_code in [200, 202, 1]:
@@ -795,15 +981,16 @@ def main():
     logger.info("=== AI News Bot Started ===")
 
     # Load configuration
-    config = Config()
+    config = get_config()
 
     if config.dry_run:
         logger.info("Running in DRY RUN mode - no actual posts will be made")
 
     # Collect news
-    hours_back = int(os.getenv('HOURS_BACK', '3'))  # デフォルト3時間前まで
-    max_entries_per_feed = int(os.getenv('MAX_ENTRIES_PER_FEED', '30'))  # デフォルト30件
-    collector = NewsCollector(RSS_FEEDS, hours_back=hours_back, max_entries_per_feed=max_entries_per_feed)
+    hours_back = config.hours_back
+    max_entries_per_feed = config.max_entries_per_feed
+    collector = NewsCollector(RSS_FEEDS, hours_back=hours_back, max_entries_per_feed=max_entries_per_feed,
+                              cache_file=config.feed_cache_file)
     articles = collector.fetch_articles()
 
     if not articles:
@@ -818,16 +1005,20 @@ def main():
         logger.warning("No relevant articles found after filtering")
         return 1
 
-    # Calculate total collected articles before publishing
-    total_collected = 0
-    for source_name, _ in RSS_FEEDS:
-        stats = collector.feed_stats.get(source_name, {'total_fetched': 0, 'recent_count': 0})
-        total_collected += stats['recent_count']
+    # Calculate total collected articles before publishing（フィード別の統計はサマリーでも使う）
+    stats_rows = [(source_name, collector.feed_stats.get(source_name, _EMPTY_STATS)) for source_name, _ in RSS_FEEDS]
+    total_collected = sum(stats['recent_count'] for _, stats in stats_rows)
+    total_fetched = sum(stats['total_fetched'] for _, stats in stats_rows)
 
     # Publish to Teams
     publisher = TeamsPublisher(config)
     published = publisher.publish_news(filtered_articles, total_collected)
 
+    # 条件付きGETの ETag/Last-Modified は実際に投稿できたときだけ保存する
+    # （先に保存すると、投稿失敗後の再実行や DRY_RUN 後の実行で全フィードが 304 になり記事を集められない）
+    if published > 0 and not config.dry_run:
+        collector.save_feed_cache()
+
     # ④ 実行サマリー
     logger.info("")
     logger.info("="*80)
@@ -845,14 +1036,9 @@ def main():
     logger.info("  フィード別収集結果: (過去{0}時間内/取得総数)".format(hours_back))
     logger.info("  " + "-"*65)
 
-    total_collected = 0
-    total_fetched = 0
-    for source_name, _ in RSS_FEEDS:
-        stats = collector.feed_stats.get(source_name, {'total_fetched': 0, 'recent_count': 0})
+    for source_name, stats in stats_rows:
         recent = stats['recent_count']
         fetched = stats['total_fetched']
-        total_collected += recent
-        total_fetched += fetched
 
         status = "✓" if recent > 0 else "✗"
         ratio_str = f"{recent:2}/{fetched:2}"
@@ -863,7 +1049,7 @@ def main():
     logger.info("")
 
     # 処理サマリー
-    max_articles_to_llm = int(os.getenv('MAX_ARTICLES_TO_LLM', '40'))
+    max_articles_to_llm = config.max_articles_to_llm
     logger.info("■ 記事処理")
     logger.info(f"  収集記事数: {len(articles)} 件")
     logger.info(f"  LLMへ送信: {min(max_articles_to_llm, len(articles))} 件")
@@ -5,21 +5,28 @@ AndroidのXアプリから共有したメールを処理してTeamsに投稿
 """
 
 import os
-import pytz
+import logging
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import re
-import base64
-import pickle
-import random
+import binascii
+import hashlib
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
-from dataclasses import dataclass
+from typing import List, Dict, Optional, Tuple
+from dataclasses import dataclass, field
 from pathlib import Path
+from zoneinfo import ZoneInfo
 
 # Gmail API imports
 from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.discovery_cache import get_static_doc
 from googleapiclient.errors import HttpError
 
 # Import setup_logger from util.log
@@ -34,31 +41,110 @@ SCOPES = [
     'https://www.googleapis.com/auth/gmail.modify'  # 既読マーク用
 ]
 
+# 日本時間（毎回タイムゾーンを引かないようモジュールで保持する）
+_JST = ZoneInfo('Asia/Tokyo')
+
+# X共有メールの解析用（インポート時に一度だけコンパイルする）
+_X_URL_RE = re.compile(r'https?://(?:www\.)?(?:twitter\.com|x\.com)/(\w+)/status/(\d+)')
+# Gmail共有の一般的な定型文（順番に適用する。前のパターンで消えた部分に後のパターンが掛からないようにするため、1つにまとめない）
+_CLEAN_RES = [
+    re.compile(pattern, re.IGNORECASE | re.DOTALL)
+    for pattern in (
+        r'Check out.*?:\s*',
+        r'Shared from.*?:\s*',
+        r'From X.*?:\s*',
+        r'.*shared.*tweet.*:\s*',
+        r'---------- Forwarded message ---------.*?\n',
+        r'From:.*?\n',
+        r'Date:.*?\n',
+        r'Subject:.*?\n',
+        r'To:.*?\n'
+    )
+]
+_TRAILING_X_URL_RE = re.compile(r'https?://(?:www\.)?(?:twitter\.com|x\.com)/\S+.*', re.DOTALL)
+_TCO_URL_RE = re.compile(r'https?://t\.co/\S+')
+# Xアプリの共有メールで投稿本文の直前に付く定型文
+_POSTED_MARKER = 'ポストしました:'
+
+# URL-safe base64 を標準の base64 に戻す変換表
+_URLSAFE_B64_TABLE = str.maketrans('-_', '+/')
+
+def decode_body_data(data: str) -> str:
+    """Gmail API の本文データ（URL-safe base64）を文字列にデコード"""
+    # パディングが省略されていても復号できるよう "==" を補う（余分なパディングは無視される）
+    return binascii.a2b_base64(data.translate(_URLSAFE_B64_TABLE) + '==').decode('utf-8', errors='ignore')
+
+# Gmail のバッチリクエスト1回にまとめる件数（Google の推奨は50件以下）
+GMAIL_BATCH_SIZE = 50
+# レート制限などで失敗したバッチ内リクエストを再試行する回数と、初回の待ち時間（秒。再試行ごとに倍にする）
+GMAIL_BATCH_RETRIES = 3
+GMAIL_BATCH_RETRY_WAIT = 1.0
+# 再試行するバッチ内リクエストのステータス（403 はレート制限の場合のみ）
+_GMAIL_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# キャッシュの保存先（スクリプトと同じ app ディレクトリ配下。コンテナでは /app/app/cache をボリュームとしてマウントする）
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+
 # Configuration
 @dataclass
 class Config:
-    """Configuration settings"""
-    teams_webhook_url: str = os.getenv("TEAMS_WEBHOOK_URL", "")
+    """Configuration settings (environment variables are read when an instance is created)"""
+    teams_webhook_url: str = field(default_factory=lambda: os.getenv("TEAMS_WEBHOOK_URL", ""))
 
     # Gmail設定
-    gmail_address: str = os.getenv("GMAIL_ADDRESS", "dummy@example.com")
-    gmail_from_addresses: str = os.getenv("GMAIL_FROM_ADDRESSES", "dummy@example.com")  # カンマ区切りの送信元アドレス
-    credentials_file: str = os.getenv("GMAIL_CREDENTIALS_FILE", "/workspace/NewsBot2/app/credentials/credentials.json")
-    token_file: str = os.getenv("GMAIL_TOKEN_FILE", "/workspace/NewsBot2/app/credentials/token.pickle")
+    gmail_address: str = field(default_factory=lambda: os.getenv("GMAIL_ADDRESS", "dummy@example.com"))
+    gmail_from_addresses: str = field(default_factory=lambda: os.getenv("GMAIL_FROM_ADDRESSES", "dummy@example.com"))  # カンマ区切りの送信元アドレス
+    credentials_file: str = field(default_factory=lambda: os.getenv("GMAIL_CREDENTIALS_FILE", "/workspace/NewsBot2/app/credentials/credentials.json"))
+    token_file: str = field(default_factory=lambda: os.getenv("GMAIL_TOKEN_FILE", "/workspace/NewsBot2/app/credentials/token.json"))
 
     # 処理設定
-    check_hours_back: int = int(os.getenv("CHECK_HOURS_BACK_TWEET", "3"))  # X共有メール用：デフォルト3時間
-    max_emails_per_run: int = int(os.getenv("MAX_EMAILS_PER_RUN", "5"))
+    check_hours_back: int = field(default_factory=lambda: int(os.getenv("CHECK_HOURS_BACK_TWEET", "3")))  # X共有メール用：デフォルト3時間
+    max_emails_per_run: int = field(default_factory=lambda: int(os.getenv("MAX_EMAILS_PER_RUN", "5")))
 
     # フィルター設定
-    process_only_unread: bool = os.getenv("PROCESS_ONLY_UNREAD", "true").lower() == "true"
-    mark_as_read: bool = os.getenv("MARK_AS_READ", "true").lower() == "true"
+    process_only_unread: bool = field(default_factory=lambda: os.getenv("PROCESS_ONLY_UNREAD", "true").lower() == "true")
+    mark_as_read: bool = field(default_factory=lambda: os.getenv("MARK_AS_READ", "true").lower() == "true")
 
     # LLM設定
-    llm_endpoint: str = os.getenv("LLM_ENDPOINT", "http://192.168.131.193:8008/v1/chat/completions")
-    llm_model: str = os.getenv("LLM_MODEL", "gpt-3.5-turbo")
+    llm_endpoint: str = field(default_factory=lambda: os.getenv("LLM_ENDPOINT", "http://192.168.131.193:8008/v1/chat/completions"))
+    llm_model: str = field(default_factory=lambda: os.getenv("LLM_MODEL", "gpt-3.5-turbo"))
+    llm_cache_dir: str = field(default_factory=lambda: os.getenv("LLM_CACHE_DIR", CACHE_DIR))  # 空で書き換え結果のキャッシュを無効化
+    # 投稿に失敗したメールは翌日の定期実行で再処理されるため、それまで書き換え結果を保持する。0 でファイルキャッシュ無効
+    llm_cache_ttl_hours: int = field(default_factory=lambda: int(os.getenv("LLM_CACHE_TTL_HOURS", "48")))
+
+    dry_run: bool = field(default_factory=lambda: os.getenv("DRY_RUN", "false").lower() == "true")
+
+
+@functools.lru_cache(maxsize=1)
+def get_config() -> Config:
+    """Return the process-wide configuration (parsed from the environment once)"""
+    return Config()
 
-    dry_run: bool = os.getenv("DRY_RUN", "false").lower() == "true"
+@functools.lru_cache(maxsize=1)
+def gmail_discovery_doc() -> Optional[str]:
+    """ライブラリ同梱の Gmail API ディスカバリー文書（プロセス内で一度だけ読み込む）"""
+    return get_static_doc('gmail', 'v1')
+
+
+def build_gmail_service(creds):
+    """Gmail API サービスを作成（ディスカバリー文書はネットワークから取得しない）"""
+    doc = gmail_discovery_doc()
+    if doc is None:
+        # 同梱文書がない場合のみ通常の build に任せる
+        return build('gmail', 'v1', credentials=creds, cache_discovery=False)
+    return build_from_document(doc, credentials=creds)
+
+
+def is_retryable_gmail_error(exception: Exception) -> bool:
+    """バッチ内リクエストのエラーが再試行で回復し得るもの（レート制限・一時的なサーバーエラー）か"""
+    if not isinstance(exception, HttpError):
+        return False
+    status = exception.resp.status
+    if status == 403:
+        # 403 は権限エラーと区別するため、レート制限の理由が付いている場合のみ再試行する
+        content = exception.content.decode('utf-8', errors='ignore') if isinstance(exception.content, bytes) else str(exception.content)
+        return 'ratelimitexceeded' in content.lower()
+    return status in _GMAIL_RETRY_STATUSES
 
 
 class GmailClient:
@@ -74,10 +160,19 @@ class GmailClient:
         token_path = Path(self.config.token_file)
         creds_path = Path(self.config.credentials_file)
 
+        legacy_token_path = token_path.with_name('token.pickle')
+        needs_save = False
+
         # トークンが存在する場合は読み込み
         if token_path.exists():
-            with open(token_path, 'rb') as token:
+            self.creds = Credentials.from_authorized_user_file(str(token_path), SCOPES)
+        elif legacy_token_path.exists():
+            # 以前の形式（pickle）のトークンは一度だけ読み込み、JSON形式で保存し直す
+            logger.info(f"Migrating Gmail token from {legacy_token_path} to {token_path}")
+            import pickle
+            with open(legacy_token_path, 'rb') as token:
                 self.creds = pickle.load(token)
+            needs_save = True
 
         # 認証が無効または存在しない場合
         if not self.creds or not self.creds.valid:
@@ -99,13 +194,14 @@ class GmailClient:
                     str(creds_path), SCOPES
                 )
                 self.creds = flow.run_local_server(port=0)
+            needs_save = True
 
-            # トークンを保存
+        # トークンを保存
+        if needs_save:
             token_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(token_path, 'wb') as token:
-                pickle.dump(self.creds, token)
+            token_path.write_text(self.creds.to_json(), encoding='utf-8')
 
-        self.service = build('gmail', 'v1', credentials=self.creds)
+        self.service = build_gmail_service(self.creds)
         # logger.info("Gmail authentication successful")  # 毎分は不要
         return True
 
@@ -116,9 +212,9 @@ class GmailClient:
 
         try:
             # 検索クエリ構築
-            jst = pytz.timezone('Asia/Tokyo')
-            after_date = datetime.now(jst) - timedelta(hours=self.config.check_hours_back)
-            after_str = after_date.strftime("%Y/%m/%d")
+            after_date = datetime.now(_JST) - timedelta(hours=self.config.check_hours_back)
+            # 日付指定だと当日0時以降の全件が対象になるため、エポック秒で対象期間ちょうどに絞る
+            after_str = str(int(after_date.timestamp()))
 
             # 設定された送信元アドレスから、自分宛のメール、X/TwitterのURLを含む
             from_addresses = self.config.gmail_from_addresses.split(',')
@@ -158,12 +254,12 @@ class GmailClient:
             if all_messages:  # メールがある時だけログ出力
                 logger.info(f"Found {len(all_messages)} X share emails total")
 
-            # 各メールの詳細を取得（時間情報も含む）
+            # 並べ替え用にヘッダーと時間情報だけを取得する（本文は処理対象に絞ってから取得）。
+            # バッチリクエストは1つずつ送る（並列に送るとユーザーごとの同時実行数・レート制限にかかる）
             emails = []
-            for msg in all_messages:
-                email_data = self.get_email_details(msg['id'])
-                if email_data:
-                    emails.append(email_data)
+            message_ids = [msg['id'] for msg in all_messages]
+            for i in range(0, len(message_ids), GMAIL_BATCH_SIZE):
+                emails.extend(self.get_email_details_batch(message_ids[i:i + GMAIL_BATCH_SIZE], metadata_only=True))
 
             # 日付でソート（古い順）
             emails.sort(key=lambda x: x.get('internalDate', '0'))
@@ -172,6 +268,10 @@ class GmailClient:
             max_count = self.config.max_emails_per_run # + random.randint(-1, 1)
             emails = emails[:max_count]
 
+            # 処理対象のメールだけ本文まで取得する
+            if emails:
+                emails = self.get_email_details_batch([email['id'] for email in emails])
+
             if emails:
                 logger.info(f"Processing {len(emails)} oldest emails")
 
@@ -181,62 +281,98 @@ class GmailClient:
             logger.error(f"Gmail API error: {e}")
             return []
 
-    def get_email_details(self, message_id: str) -> Optional[Dict]:
-        """メールの詳細を取得"""
-        try:
-            message = self.service.users().messages().get(
-                userId='me',
-                id=message_id
-            ).execute()
+    def get_email_details_batch(self, message_ids: List[str], metadata_only: bool = False) -> List[Dict]:
+        """複数メールの詳細をバッチリクエストで取得（順序は message_ids と同じ）
 
-            # ヘッダーから情報取得
-            headers = message['payload'].get('headers', [])
-            subject = ""
-            date = ""
-
-            for header in headers:
-                name = header['name']
-                value = header['value']
-                if name == 'Subject':
-                    subject = value
-                elif name == 'Date':
-                    date = value
-
-            # 本文を取得
-            body = self.extract_body(message['payload'])
-
-            return {
-                'id': message_id,
-                'subject': subject,
-                'date': date,
-                'body': body,
-                'snippet': message.get('snippet', ''),
-                'internalDate': message.get('internalDate', '0')  # ソート用のタイムスタンプ
-            }
+        metadata_only=True の場合は Subject/Date ヘッダーと internalDate のみ取得し、本文は空になる
+        レート制限などで失敗したメールは、間隔を空けて失敗したものだけ再取得する
+        （取りこぼすと「古い順」の選定が黙ってずれるため）
+        """
+        service = self.service
+        messages = service.users().messages()
+        results = {}
+        pending = list(range(len(message_ids)))
+
+        for attempt in range(GMAIL_BATCH_RETRIES + 1):
+            if attempt:
+                time.sleep(GMAIL_BATCH_RETRY_WAIT * 2 ** (attempt - 1))
+            failed = []
+
+            def on_response(request_id, message, exception):
+                if exception is None:
+                    if message:
+                        results[int(request_id)] = self.parse_message(message)
+                elif is_retryable_gmail_error(exception):
+                    failed.append(int(request_id))
+                else:
+                    logger.error(f"Error getting email details: {exception}")
 
-        except HttpError as e:
-            logger.error(f"Error getting email details: {e}")
-            return None
+            batch = service.new_batch_http_request(callback=on_response)
+            for i in pending:
+                if metadata_only:
+                    request = messages.get(userId='me', id=message_ids[i], format='metadata', metadataHeaders=['Subject', 'Date'])
+                else:
+                    request = messages.get(userId='me', id=message_ids[i])
+                batch.add(request, request_id=str(i))
+            batch.execute()
+
+            if not failed:
+                break
+            pending = sorted(failed)
+            if attempt == GMAIL_BATCH_RETRIES:
+                logger.error(f"Could not get {len(pending)} email details after {GMAIL_BATCH_RETRIES} retries")
+                break
+            logger.warning(f"Gmail rate limited {len(pending)} requests, retrying ({attempt + 1}/{GMAIL_BATCH_RETRIES})")
+
+        return [results[i] for i in sorted(results)]
+
+    def parse_message(self, message: Dict) -> Dict:
+        """Gmail API のメッセージからヘッダーと本文を取り出す"""
+        # ヘッダーから情報取得
+        headers = message['payload'].get('headers', [])
+        subject = ""
+        date = ""
+
+        for header in headers:
+            name = header['name']
+            value = header['value']
+            if name == 'Subject':
+                subject = value
+            elif name == 'Date':
+                date = value
+
+        # 本文を取得
+        body = self.extract_body(message['payload'])
 
-    def extract_body(self, payload) -> str:
-        """メール本文を抽出"""
-        body = ""
+        return {
+            'id': message['id'],
+            'subject': subject,
+            'date': date,
+            'body': body,
+            'snippet': message.get('snippet', ''),
+            'internalDate': message.get('internalDate', '0')  # ソート用のタイムスタンプ
+        }
+
+    def extract_body(self, payload, out: Optional[List[str]] = None) -> str:
+        """メール本文を抽出（パートごとの文字列をリストに集めて最後に1回だけ連結する）"""
+        is_root = out is None
+        if is_root:
+            out = []
 
         # シングルパートメール
         if 'body' in payload and 'data' in payload['body']:
-            data = payload['body']['data']
-            body = base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
+            out.append(decode_body_data(payload['body']['data']))
 
         # マルチパートメール
         elif 'parts' in payload:
             for part in payload['parts']:
                 if part['mimeType'] == 'text/plain':
-                    data = part['body']['data']
-                    body += base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
+                    if 'data' in part.get('body', {}):
+                        out.append(decode_body_data(part['body']['data']))
                 elif 'parts' in part:  # ネストされたパート
-                    body += self.extract_body(part)
+                    self.extract_body(part, out)
 
-        return body
+        return ''.join(out) if is_root else ''
 
     def mark_as_read(self, message_id: str):
         """メールを既読にする"""
@@ -268,9 +404,8 @@ class XShareParser:
         # logger.debug(f"Email body preview: {body[:500]}...")
         # logger.debug(f"Email subject: {subject}")
 
-        # X/TwitterのURLを抽出
-        url_pattern = r'https?://(?:www\.)?(?:twitter\.com|x\.com)/(\w+)/status/(\d+)'
-        url_match = re.search(url_pattern, body + ' ' + subject)
+        # X/TwitterのURLを抽出（ほぼ本文にあるので、件名は本文になかった場合のみ探す）
+        url_match = _X_URL_RE.search(body) or _X_URL_RE.search(subject)
 
         if not url_match:
             logger.warning("No X/Twitter URL found in email")
@@ -283,40 +418,21 @@ class XShareParser:
         # 本文からツイートテキストを抽出（改善版）
         tweet_text = ""
 
-        # 方法1: URLの前の部分から取得
-        text_before_url = body.split(url)[0].strip()
-
-        # 方法2: 全体から共有メールの定型文を除去
-        full_text = body
-
-        # Gmail共有の一般的なパターンを除去
-        clean_patterns = [
-            r'Check out.*?:\s*',
-            r'Shared from.*?:\s*',
-            r'From X.*?:\s*',
-            r'.*shared.*tweet.*:\s*',
-            r'---------- Forwarded message ---------.*?\n',
-            r'From:.*?\n',
-            r'Date:.*?\n',
-            r'Subject:.*?\n',
-            r'To:.*?\n'
-        ]
-
-        for pattern in clean_patterns:
-            text_before_url = re.sub(pattern, '', text_before_url, flags=re.IGNORECASE | re.DOTALL)
-            full_text = re.sub(pattern, '', full_text, flags=re.IGNORECASE | re.DOTALL)
+        marker_idx = body.find(_POSTED_MARKER)
+        if marker_idx >= 0:
+            # Xアプリの共有形式：「ポストしました:」の後の部分のみを取得（転送ヘッダー等の定型文は含まれない）
+            # 先頭の空白文字（改行、スペース、タブなど）も削除
+            full_text = body[marker_idx + len(_POSTED_MARKER):].lstrip()
+        else:
+            # それ以外は全体から共有メールの定型文を除去
+            full_text = body
+            for clean_re in _CLEAN_RES:
+                full_text = clean_re.sub('', full_text)
 
         # URLとその後の余計な部分を削除
-        full_text = re.sub(r'https?://(?:www\.)?(?:twitter\.com|x\.com)/\S+.*', '', full_text, flags=re.DOTALL)
+        full_text = _TRAILING_X_URL_RE.sub('', full_text)
         # t.co短縮URLを削除
-        full_text = re.sub(r'https?://t\.co/\S+', '', full_text)
-
-        # 「ポストしました:」までの部分を削除
-        if 'ポストしました:' in full_text:
-            # 「ポストしました:」の後の部分のみを取得
-            full_text = full_text.split('ポストしました:', 1)[-1]
-            # 先頭の空白文字（改行、スペース、タブなど）を削除
-            full_text = full_text.lstrip()
+        full_text = _TCO_URL_RE.sub('', full_text)
 
         # 改行で分割し、意味のあるテキストを探す
         lines = full_text.strip().split('\n')
@@ -358,6 +474,67 @@ class TextRewriter:
         self.config = config
         self.endpoint = config.llm_endpoint
         self.model = config.llm_model
+        self._cache: Dict[str, str] = {}  # 同一実行内の書き換え結果
+        # LLM への接続は keep-alive で使い回す。応答待ちのタイムアウトは再試行しない（待ち時間が倍増するため）
+        self._session = requests.Session()
+        retry = Retry(
+            total=2,
+            read=0,
+            backoff_factor=0.3,
+            status_forcelist=[429, 502, 503, 504],
+            allowed_methods=["POST"],
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        self.prune_cached_rewrites()
+
+    def cache_path(self, key: str) -> Optional[Path]:
+        """書き換え結果のキャッシュファイルのパス（キャッシュ無効なら None）"""
+        if not self.config.llm_cache_dir or self.config.llm_cache_ttl_hours <= 0:
+            return None
+        return Path(self.config.llm_cache_dir) / f"rewrite_{key}.txt"
+
+    def prune_cached_rewrites(self):
+        """期限切れの書き換え結果を削除（キャッシュディレクトリが増え続けないようにする）"""
+        if not self.config.llm_cache_dir or self.config.llm_cache_ttl_hours <= 0:
+            return
+        expire_before = time.time() - self.config.llm_cache_ttl_hours * 3600
+        for path in Path(self.config.llm_cache_dir).glob("rewrite_*.txt"):
+            try:
+                if path.stat().st_mtime < expire_before:
+                    path.unlink()
+            except OSError:
+                pass
+
+    def load_cached_rewrite(self, key: str) -> Optional[str]:
+        """以前の書き換え結果を取得"""
+        if key in self._cache:
+            return self._cache[key]
+        path = self.cache_path(key)
+        if path is None:
+            return None
+        try:
+            if time.time() - path.stat().st_mtime > self.config.llm_cache_ttl_hours * 3600:
+                return None
+            text = path.read_text(encoding='utf-8')
+        except OSError:
+            return None
+        self._cache[key] = text
+        return text
+
+    def store_cached_rewrite(self, key: str, text: str):
+        """書き換え結果を保存"""
+        self._cache[key] = text
+        path = self.cache_path(key)
+        if path is None:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(text, encoding='utf-8')
+        except OSError as e:
+            logger.warning(f"Could not write rewrite cache: {e}")
 
     def rewrite_text(self, original_text: str) -> str:
         """
@@ -371,6 +548,13 @@ class TextRewriter:
             logger.warning("LLM endpoint not configured, using original text")
             return original_text
 
+        # 同じ投稿を以前に書き換えていれば、その結果を使う
+        cache_key = hashlib.blake2b(f"{self.model}|{original_text}".encode('utf-8'), digest_size=16).hexdigest()
+        cached_text = self.load_cached_rewrite(cache_key)
+        if cached_text is not None:
+            logger.info("Using cached LLM rewrite")
+            return cached_text
+
         try:
             # システムプロンプト
             system_prompt = """あなたはTwitterで話題を紹介する人です。
@@ -403,7 +587,7 @@ class TextRewriter:
             }
 
             # LLMへのリクエスト
-            response = requests.post(
+            response = self._session.post(
                 self.endpoint,
                 headers={"Content-Type": "application/json"},
                 json=request_body,
@@ -415,6 +599,8 @@ class TextRewriter:
                 if "choices" in result and len(result["choices"]) > 0:
                     rewritten_text = result["choices"][0]["message"]["content"].strip()
                     logger.info("Text successfully rewritten by LLM")
+                    if rewritten_text:
+                        self.store_cached_rewrite(cache_key, rewritten_text)
                     return rewritten_text
                 else:
                     logger.warning("Unexpected LLM response format")
@@ -436,9 +622,23 @@ class TeamsPublisher:
     def __init__(self, config: Config):
         self.config = config
         self.text_rewriter = TextRewriter(config)
-
-    def create_x_share_card(self, x_info: Dict) -> Dict:
-        """X共有用のAdaptive Card作成"""
+        # Webhook への投稿は keep-alive で接続を使い回し、一時的なエラーは再試行する
+        # POST は冪等でないため、Teams が受け付けた可能性のある 500/504 や応答待ちのタイムアウトは再試行しない（二重投稿を防ぐ）
+        self._session = requests.Session()
+        retry = Retry(
+            total=2,
+            read=0,
+            backoff_factor=0.3,
+            status_forcelist=[429, 502, 503],
+            allowed_methods=["POST"],
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+
+    def rewrite_x_text(self, x_info: Dict) -> str:
+        """投稿テキストをLLMで紹介文に書き換え（失敗時は元のテキスト）"""
 
         # テキストが空の場合
         original_text = x_info['text'] if x_info['text'] else "[メディアのみの投稿]"
@@ -449,14 +649,20 @@ class TeamsPublisher:
         # 書き換えが失敗した場合は元のテキストを使用
         if not text_display:
             text_display = original_text
+        return text_display
+
+    def create_x_share_card(self, x_info: Dict, text_display: Optional[str] = None) -> Dict:
+        """X共有用のAdaptive Card作成（text_display を省略するとここで書き換える）"""
+
+        if text_display is None:
+            text_display = self.rewrite_x_text(x_info)
 
         # Adaptive Cardで改行を表示するため、\nを\n\nに変換（Markdownでの改行）
         # また、TeamsのAdaptive Cardでは2つの改行が必要
         text_display = text_display.replace('\n', '\n\n')
 
         # 現在時刻を取得（JST）
-        jst = pytz.timezone('Asia/Tokyo')
-        now = datetime.now(jst)
+        now = datetime.now(_JST)
         time_str = now.strftime("%Y/%m/%d %H:%M:%S")
 
         return {
@@ -501,17 +707,17 @@ class TeamsPublisher:
             }]
         }
 
-    def post_to_teams(self, x_info: Dict) -> bool:
+    def post_to_teams(self, x_info: Dict, text_display: Optional[str] = None) -> bool:
         """Teamsに投稿"""
 
-        card = self.create_x_share_card(x_info)
+        card = self.create_x_share_card(x_info, text_display)
 
         if self.config.dry_run:
             logger.info(f"DRY RUN - Would post to Teams: @{x_info['username']} - {x_info['text'][:50]}...")
             return True
 
         try:
-            response = requests.post(
+            response = self._session.post(
                 self.config.teams_webhook_url,
                 json=card,
                 timeout=10
@@ -529,12 +735,63 @@ class TeamsPublisher:
             return False
 
 
+def prepare_email(email: Dict, parser: XShareParser, publisher: TeamsPublisher) -> Optional[Tuple[Dict, str]]:
+    """1通のメールを解析し、投稿テキストをLLMで書き換える（パイプラインの前段）"""
+    logger.info(f"Processing email: {email.get('subject', '')[:50]}...")
+
+    # デバッグ：メール内容全文を出力（本文は大きくなり得るのでDEBUG時のみ）
+    debug_enabled = logger.isEnabledFor(logging.DEBUG)
+    if debug_enabled:
+        logger.debug("=" * 60)
+        logger.debug("【メール内容全文】")
+        logger.debug("=" * 60)
+        logger.debug(f"Subject: {email.get('subject', '')}")
+        logger.debug(f"Date: {email.get('date', '')}")
+        logger.debug("Body:")
+        logger.debug(email.get('body', ''))
+        logger.debug("=" * 60)
+    else:
+        logger.info(f"Body length: {len(email.get('body', ''))}")
+
+    # X情報を抽出
+    x_info = parser.extract_x_info(email)
+
+    if not x_info:
+        logger.warning("Could not extract X info from email")
+        return None
+
+    # デバッグ：投稿内容全文を出力
+    if debug_enabled:
+        logger.debug("=" * 60)
+        logger.debug("【Teams投稿内容】")
+        logger.debug("=" * 60)
+        logger.debug(f"URL: {x_info['url']}")
+        logger.debug(f"Username: @{x_info['username']}")
+        logger.debug(f"Tweet ID: {x_info['tweet_id']}")
+        logger.debug(f"Text:\n{x_info['text']}")
+        logger.debug("=" * 60)
+
+    return x_info, publisher.rewrite_x_text(x_info)
+
+
+def publish_email(email: Dict, x_info: Dict, text_display: str, publisher: TeamsPublisher,
+                  gmail: GmailClient, config: Config) -> bool:
+    """書き換え済みの投稿をTeamsに投稿し、成功したら既読にする（パイプラインの後段）"""
+    if not publisher.post_to_teams(x_info, text_display):
+        return False
+
+    # 成功したら既読にする
+    if config.mark_as_read:
+        gmail.mark_as_read(email['id'])
+    return True
+
+
 def main():
     """メイン処理"""
 
     # logger.info("=== X Gmail Share to Teams Bridge Started ===")  # 毎分は不要
 
-    config = Config()
+    config = get_config()
 
     if config.dry_run:
         logger.info("Running in DRY RUN mode")
@@ -556,46 +813,15 @@ def main():
     parser = XShareParser()
     publisher = TeamsPublisher(config)
 
+    # LLM の書き換えは並列に行い、Teams への投稿は古いメールから順に1件ずつ行う。
+    # 先頭のメールの書き換えが終わり次第投稿を始め、残りの書き換え待ちと投稿を重ねる
     posted_count = 0
-
-    # 各メールを処理
-    for email in emails:
-        logger.info(f"Processing email: {email.get('subject', '')[:50]}...")
-
-        # デバッグ：メール内容全文を出力
-        logger.info("=" * 60)
-        logger.info("【メール内容全文】")
-        logger.info("=" * 60)
-        logger.info(f"Subject: {email.get('subject', '')}")
-        logger.info(f"Date: {email.get('date', '')}")
-        logger.info("Body:")
-        logger.info(email.get('body', ''))
-        logger.info("=" * 60)
-
-        # X情報を抽出
-        x_info = parser.extract_x_info(email)
-
-        if not x_info:
-            logger.warning("Could not extract X info from email")
-            continue
-
-        # デバッグ：投稿内容全文を出力
-        logger.info("=" * 60)
-        logger.info("【Teams投稿内容】")
-        logger.info("=" * 60)
-        logger.info(f"URL: {x_info['url']}")
-        logger.info(f"Username: @{x_info['username']}")
-        logger.info(f"Tweet ID: {x_info['tweet_id']}")
-        logger.info(f"Text:\n{x_info['text']}")
-        logger.info("=" * 60)
-
-        # Teamsに投稿
-        if publisher.post_to_teams(x_info):
-            posted_count += 1
-
-            # 成功したら既読にする
-            if config.mark_as_read:
-                gmail.mark_as_read(email['id'])
+    with ThreadPoolExecutor(max_workers=min(len(emails), 4)) as executor:
+        rewrite_futures = [executor.submit(prepare_email, email, parser, publisher) for email in emails]
+        for email, future in zip(emails, rewrite_futures):
+            prepared = future.result()
+            if prepared and publish_email(email, *prepared, publisher, gmail, config):
+                posted_count += 1
 
     if posted_count > 0:
         logger.info(f"Posted {posted_count} X shares to Teams")
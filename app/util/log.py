@@ -1,156 +1,291 @@
 # log.py
 import os
 import json
+import orjson
 import re
 import logging
+import queue
+import atexit
+from logging.handlers import QueueHandler, QueueListener, MemoryHandler
 from datetime import datetime
-import pytz
-import base64
+from zoneinfo import ZoneInfo
 import requests
 from flask import Response
 from typing import Union, Dict, Any, Tuple
 
-japan_tz = pytz.timezone('Asia/Tokyo')
+japan_tz = ZoneInfo('Asia/Tokyo')
 
 class JapanTimeFormatter(logging.Formatter):
+    # 秒単位で整形済みの日時文字列をキャッシュする (エポック秒, 秒までの日時部分, UTCオフセット部分)
+    _cached_second = (None, "", "")
+
     def formatTime(self, record, datefmt=None):
-        dt = datetime.fromtimestamp(record.created, japan_tz)
         if datefmt:
+            dt = datetime.fromtimestamp(record.created, japan_tz)
             return dt.strftime(datefmt)
-        return dt.isoformat()
+        # 秒が変わったときだけ日時を整形し、マイクロ秒部分のみ毎回付け足す
+        second = int(record.created)
+        cached = self._cached_second
+        if cached[0] != second:
+            iso = datetime.fromtimestamp(second, japan_tz).isoformat()
+            cached = (second, iso[:19], iso[19:])
+            self._cached_second = cached
+        micro = min(round((record.created - second) * 1_000_000), 999_999)
+        return f"{cached[1]}.{micro:06d}{cached[2]}"
+
+class QueueDrainMemoryHandler(MemoryHandler):
+    """
+    QueueListener のスレッド上でファイル書き込みをまとめるためのハンドラ
+    キューにログが溜まっている間はバッファし、キューが空になった時点（またはERROR以上、容量超過時）に
+    まとめて書き出す。平常時は1件ずつすぐに書き出されるため、ログの出力が遅れることはない
+    """
+    def __init__(self, log_queue, capacity, target):
+        super().__init__(capacity, flushLevel=logging.ERROR, target=target)
+        self.log_queue = log_queue
+
+    def shouldFlush(self, record):
+        return super().shouldFlush(record) or self.log_queue.empty()
 
 # additional ロガーをファイル内でのみ使用するグローバル変数として定義
 _additional_logger = None
+# log.log とコンソールへ出力するハンドラ（全ロガーで共有する）
+_shared_queue_handler = None
+
+# 切り詰め判定用（インポート時に一度だけコンパイルする）
+_ALNUM_RE = re.compile(r'[a-zA-Z0-9]+\Z')
+_BASE64_RE = re.compile(r'[A-Za-z0-9+/]*={0,2}\Z')
+# is_confidential の場合にマスクするキー（AIへの入出力）
+_SENSITIVE_KEYS = frozenset(('message', 'messages', 'content', 'prompt', 'query', 'choices'))
+# content_typeやfilenameなど、切り詰めないシステム的な値に含まれる文字列
+_SYSTEM_VALUE_RE = re.compile(r'content-type|\.xlsx|\.pdf|\.doc', re.IGNORECASE)
+
+# ログの出力先ディレクトリ（コンテナ内かどうかをインポート時に一度だけ判定する）
+_LOG_DIR = "/app/app/logs" if os.path.exists("/app/app/logs") else "/workspace/NewsBot2/app/logs"
+
+# これより大きいリクエスト・レスポンスボディはログに記録しない
+MAX_LOG_BODY = 64 * 1024
+# ログに出力するクライアント名の略称
+_CLIENT_SHORT_NAMES = {"ChatAI": "CHAT", "chrome-AI": "CHRM"}
+# ボディを記録しないバイナリ系のContent-Type（前方一致）
+_BINARY_CONTENT_TYPES = ('multipart/', 'application/octet-stream', 'image/', 'video/', 'audio/')
+# リクエストボディを記録する間隔（N件に1件。1なら全件記録）
+LOG_SAMPLE_N = max(1, int(os.getenv('LOG_SAMPLE_N', '1')))
 
 def setup_logger(name):
+    global _shared_queue_handler, _additional_logger
     # ロガーの作成
     logger = logging.getLogger(name)
+    # 同じ名前で初期化済みの場合はそのまま返す
+    if getattr(logger, "_newsbot_initialized", False):
+        return logger
     logger.setLevel(logging.INFO)
     # 既存のハンドラをクリア（重複を防ぐ）
     logger.handlers.clear()
-    # ファイルハンドラの設定
-    import os
-    log_path = "/app/app/logs/log.log" if os.path.exists("/app/app/logs") else "/workspace/NewsBot2/app/logs/log.log"
-    file_handler = logging.FileHandler(log_path, encoding='utf-8')
-    file_handler.setLevel(logging.INFO)
-    # ストリームハンドラの設定
-    stream_handler = logging.StreamHandler()
-    stream_handler.setLevel(logging.INFO)
-    # フォーマッタの設定
-    formatter = JapanTimeFormatter('■■■■■■■■%(asctime)s - %(message)s')
-    file_handler.setFormatter(formatter)
-    stream_handler.setFormatter(formatter)
-    # ハンドラをロガーに追加
-    logger.addHandler(file_handler)
-    logger.addHandler(stream_handler)
-
-    # additional ロガーを内部的に初期化
-    global _additional_logger
-
-    # additional 用ロガー
-    _additional_logger = logging.getLogger(name + ".additional")
-    _additional_logger.setLevel(logging.INFO)
-    _additional_logger.handlers.clear()
-    _additional_logger.propagate = True
-    special_log_path = "/app/app/logs/Special.log" if os.path.exists("/app/app/logs") else "/workspace/NewsBot2/app/logs/Special.log"
-    additional_handler = logging.FileHandler(special_log_path, encoding='utf-8')
-    additional_handler.setLevel(logging.INFO)
-    additional_handler.setFormatter(formatter)
-    _additional_logger.addHandler(additional_handler)
 
-    return logger
+    # 出力先のハンドラとリスナーは最初の呼び出し時にだけ作成し、すべてのロガーで共有する
+    # （モジュールごとに呼ばれても同じファイルを重複して開かない）
+    if _shared_queue_handler is None:
+        # フォーマッタの設定
+        formatter = JapanTimeFormatter('■■■■■■■■%(asctime)s - %(message)s')
+        # ファイルハンドラの設定
+        file_handler = logging.FileHandler(os.path.join(_LOG_DIR, "log.log"), encoding='utf-8')
+        file_handler.setLevel(logging.INFO)
+        file_handler.setFormatter(formatter)
+        # ストリームハンドラの設定
+        stream_handler = logging.StreamHandler()
+        stream_handler.setLevel(logging.INFO)
+        stream_handler.setFormatter(formatter)
+        _shared_queue_handler = ProcessLocalQueueHandler(file_handler, stream_handler)
 
-# ロガーの初期化
-logger = setup_logger(__name__)
+        # additional 用ロガー（Special.log）
+        additional_handler = logging.FileHandler(os.path.join(_LOG_DIR, "Special.log"), encoding='utf-8')
+        additional_handler.setLevel(logging.INFO)
+        additional_handler.setFormatter(formatter)
+        _additional_logger = logging.getLogger(name + ".additional")
+        _additional_logger.setLevel(logging.INFO)
+        _additional_logger.handlers.clear()
+        _additional_logger.propagate = True
+        _additional_logger.addHandler(ProcessLocalQueueHandler(additional_handler))
+
+    logger.addHandler(_shared_queue_handler)
+    logger._newsbot_initialized = True
+    return logger
 
-def _log_info(message, client_name=None):
+class ProcessLocalQueueHandler(QueueHandler):
+    """
+    ハンドラへの書き込みをバックグラウンドスレッドで行う QueueHandler
+    呼び出し元はキューへの追加のみ行い、ファイルへの書き込みはログが連続している間はまとめて行う
+    リスナースレッドはプロセスごとに最初のログ出力時に起動する
+    （uWSGI のように import 後に fork されたワーカーには親のスレッドが存在しないため）
     """
-    内部用ログ出力関数。メインのロガーに加えて、クライアント名に応じた専用ロガーにも出力する。
+    def __init__(self, file_handler, *other_handlers):
+        """
+        Args:
+            file_handler: 書き込みをまとめる対象のファイルハンドラ
+            other_handlers: そのまま出力するハンドラ（コンソールなど）
+        """
+        super().__init__(None)
+        self.file_handler = file_handler
+        self.other_handlers = other_handlers
+        self._pid = None
 
-    Args:
-        message: ログメッセージ
-        client_name: クライアント名 (ChatAI または chrome-AI)
+    def emit(self, record):
+        # emit はハンドラのロックを取得した状態で呼ばれるため、リスナーの起動は1回だけ行われる
+        if self._pid != os.getpid():
+            self._start_listener()
+        super().emit(record)
+
+    def _start_listener(self):
+        """
+        このプロセス用のキューとリスナースレッドを作成する
+        fork 前のキューやバッファの内容は親プロセスが書き込むため引き継がない
+        """
+        log_queue = queue.SimpleQueue()
+        buffered_file_handler = QueueDrainMemoryHandler(log_queue, 256, self.file_handler)
+        buffered_file_handler.setLevel(logging.INFO)
+        listener = QueueListener(log_queue, buffered_file_handler, *self.other_handlers, respect_handler_level=True)
+        listener.start()
+        self.queue = log_queue
+        self._pid = os.getpid()
+        # 終了時にキューに残ったログを書き出す
+        atexit.register(_stop_queue_listener, listener, buffered_file_handler, self._pid)
+
+def _stop_queue_listener(listener: QueueListener, buffered_file_handler: MemoryHandler, pid: int):
     """
-    if client_name == "ChatAI" and _additional_logger:
-        _additional_logger.info(message)
-    else:
-        logger.info(message)
+    リスナーを停止し、バッファに残ったログを書き出す
+    fork された子プロセスでは親プロセスのリスナーを扱わない（親と同じログを二重に書き出さない）
+    """
+    if os.getpid() != pid:
+        return
+    listener.stop()
+    buffered_file_handler.close()
 
-def _log_error(message, client_name=None):
+# ロガーの初期化
+logger = setup_logger(__name__)
+
+def _get_logger(client_name=None) -> logging.Logger:
     """
-    内部用エラーログ出力関数。メインのロガーに加えて、クライアント名に応じた専用ロガーにも出力する。
+    クライアント名に応じた出力先ロガーを返す
 
     Args:
-        message: ログメッセージ
         client_name: クライアント名 (ChatAI または chrome-AI)
+    Returns:
+        logging.Logger: ChatAI の場合は additional ロガー、それ以外はメインのロガー
     """
     if client_name == "ChatAI" and _additional_logger:
-        _additional_logger.error(message)
-    else:
-        logger.info(message)
+        return _additional_logger
+    return logger
 
-def log_request(request_id: str, request, client_name = "") -> bool:
+def log_request(request_id: str, request, client_name = "", headers: Dict = None, read_body: bool = True, parsed_body: Dict = None) -> bool:
     """
     リクエストのログを記録する関数
     Args:
         request_id: リクエストの識別子
         request: リクエストオブジェクト
+        headers: 取り出し済みのリクエストヘッダー（省略時は request から取得）
+        read_body: ボディを読み込んで記録するかどうか（False の場合はストリームを消費しない）
+        parsed_body: 解析済みのJSONボディ（指定時はボディを再度パースせずに使う）
     """
     is_confidential = False
-    name = "UNKN"
-    if   client_name == "ChatAI"    : name = "CHAT"
-    elif client_name == "chrome-AI" : name = "CHRM"
-    method = request.method
-    url = request.url
-    headers = dict(request.headers)
-    body = request.get_data()
-    truncated_body, is_confidential = parse_and_truncate_body(body)
-    _log_info(
-        f"[REQ_{name}] {request_id} - {method} {url} "
-        f"HEADER:{headers} BODY:{truncated_body}",
-        client_name
+    target_logger = _get_logger(client_name)
+    if not target_logger.isEnabledFor(logging.INFO):
+        # ログが出力されない場合はヘッダーやボディを整形せず、機密判定のみ行う
+        return classify_without_body(request) if read_body else True
+    name = _CLIENT_SHORT_NAMES.get(client_name, "UNKN")
+    if headers is None:
+        headers = dict(request.headers)
+    if read_body and should_log_body(request_id, request):
+        body = parsed_body if isinstance(parsed_body, dict) else request.get_data()
+        truncated_body, is_confidential = parse_and_truncate_body(body)
+    elif read_body:
+        # サイズ超過またはサンプリング対象外のため、ボディは記録せず機密判定のみ行う
+        truncated_body, is_confidential = f"(not logged: {request.content_length} bytes)", classify_without_body(request)
+    else:
+        # ボディの中身を確認できないため、機密データとして扱う
+        truncated_body, is_confidential = f"(not logged: {request.content_length} bytes)", True
+    target_logger.info(
+        "[REQ_%s] %s - %s %s HEADER:%s BODY:%s",
+        name, request_id, request.method, request.url, headers, truncated_body
     )
     return is_confidential
 
+def should_log_body(request_id: str, request) -> bool:
+    """
+    リクエストボディをログに記録するかどうかを判定する
+    Args:
+        request_id: リクエストの識別子（6桁の連番）
+        request: リクエストオブジェクト
+    Returns:
+        bool: MAX_LOG_BODY 以下、バイナリ以外、かつサンプリング対象であればTrue
+    """
+    content_length = request.content_length
+    if content_length is not None and content_length > MAX_LOG_BODY:
+        return False
+    # アップロードファイルなどのバイナリはデコード・パースを試みない
+    if request.mimetype.startswith(_BINARY_CONTENT_TYPES):
+        return False
+    return LOG_SAMPLE_N == 1 or int(request_id) % LOG_SAMPLE_N == 0
+
+def classify_without_body(request) -> bool:
+    """
+    ボディを記録しない場合の機密判定
+    クライアント判定で解析済みのJSON（Flaskがキャッシュしている）があれば、その is_alt を使う
+    Args:
+        request: リクエストオブジェクト
+    Returns:
+        bool: 機密データであればTrue
+    """
+    if request.is_json:
+        json_data = request.get_json(silent=True)
+        if isinstance(json_data, dict):
+            return json_data.get('is_alt', False)
+    return False
+
 
-def log_response(request_id: str, resp: Union[Response, requests.Response], is_confidential: bool = False) -> None:
+def log_response(request_id: str, resp: Union[Response, requests.Response], is_confidential: bool = False, is_stream: bool = False) -> None:
     """
     レスポンスのログを記録する関数
     Args:
         request_id: リクエストの識別子
         resp: FlaskのResponse オブジェクトまたはrequestsのResponseオブジェクト
+        is_stream: ストリーミング中継するレスポンスかどうか（ボディは読まずにログを記録する）
     """
+    if not logger.isEnabledFor(logging.INFO):
+        # ログが出力されない場合はヘッダーの取り出しやボディの解析を行わない
+        return
     if resp is None:
-        logger.info(f"[RESP] {request_id} - Response is None")
+        logger.info("[RESP] %s - Response is None", request_id)
         return
 
     status_code = resp.status_code
     headers = dict(resp.headers)
 
+    if is_stream:
+        # ボディを読むとストリームを消費してしまうため、ヘッダーのみ記録する
+        logger.info("[RESP] %s - %s HEADER:%s BODY: (streaming)", request_id, status_code, headers)
+        return
+
     try:
-        
+        # Flask Response と requests Response のどちらもボディはメモリ上にある
+        raw = resp.get_data() if isinstance(resp, Response) else resp.content
+        if len(raw) > MAX_LOG_BODY or resp.headers.get('content-type', '').lower().startswith(_BINARY_CONTENT_TYPES):
+            # 大きなボディやバイナリは解析せず、サイズのみ記録する（切り詰めるためだけに全体をパースしない）
+            logger.info("[RESP] %s - %s HEADER:%s BODY:(not logged: %d bytes)", request_id, status_code, headers, len(raw))
+            return
         if isinstance(resp, Response):
             # Flask Response の場合
-            response_data = json.loads(resp.get_data(as_text=True))
+            response_data = orjson.loads(raw)
         else:
             # requests Response の場合
-            response_data = resp.json() if resp.headers.get('content-type', '').startswith('application/json') else resp.text
+            response_data = orjson.loads(raw) if resp.headers.get('content-type', '').startswith('application/json') else resp.text
 
         truncated_body, is_confidential = parse_and_truncate_body(response_data, is_confidential)
-        logger.info(
-            f"[RESP] {request_id} - {status_code} "
-            f"HEADER:{headers} BODY:{truncated_body}"
-        )
+        logger.info("[RESP] %s - %s HEADER:%s BODY:%s", request_id, status_code, headers, truncated_body)
     except json.JSONDecodeError:
         # JSONでないレスポンスの場合
-        logger.info(
-            f"[RESP] {request_id} - {status_code} "
-            f"HEADER:{headers} BODY: Non-JSON response"
-        )
+        logger.info("[RESP] %s - %s HEADER:%s BODY: Non-JSON response", request_id, status_code, headers)
     except Exception as e:
-        logger.error(
-            f"[RESP] {request_id} - Error processing response: {str(e)}"
-        )
+        logger.error("[RESP] %s - Error processing response: %s", request_id, e)
 
 def parse_and_truncate_body(body: Union[str, bytes, Dict], is_confidential: bool = False) -> Tuple[str, bool]:
     """
@@ -165,21 +300,24 @@ def parse_and_truncate_body(body: Union[str, bytes, Dict], is_confidential: bool
         if isinstance(body, dict):
             body_dict = body
         else:
-            # 文字列化してJSONパース
-            if isinstance(body, bytes):
-                body = body.decode('utf-8')
-            body_dict = json.loads(body)
+            # バイト列はデコードせずにそのままJSONパースする（デコード済みの中間文字列を作らない）
+            body_dict = orjson.loads(body)
         # 長い値を切り詰める
         is_confidential = body_dict.get('is_alt', is_confidential)
         truncated_dict = truncate_long_values("root", body_dict, is_confidential, max_length=100)
-        return json.dumps(truncated_dict, ensure_ascii=False, indent=2), is_confidential
+        # インデントせず1行で出力する（ログの行数・書き込み量を抑え、grepしやすくする）
+        return orjson.dumps(truncated_dict, option=orjson.OPT_NON_STR_KEYS).decode(), is_confidential
     except (json.JSONDecodeError, TypeError, UnicodeDecodeError):
         # JSONでない場合は文字列として返す
+        if isinstance(body, bytes):
+            return body.decode('utf-8', errors='replace'), is_confidential
         return str(body), is_confidential
 
 def truncate_long_values(key: str, value: Any, is_confidential: bool = False, max_length: int = 100) -> Any:
     """
-    辞書内の文字列値を再帰的にチェックし、長い値を切り詰める
+    辞書内の文字列値をチェックし、長い値を切り詰める
+    再帰を使わずスタックで走査し、変更のあったコンテナだけを複製する
+    （変更がなければ元のオブジェクトをそのまま返す）
     Args:
         key: 現在処理中のキー名
         value: 処理対象のデータ（dict, list, または基本型）
@@ -188,23 +326,64 @@ def truncate_long_values(key: str, value: Any, is_confidential: bool = False, ma
     Returns:
         処理済みのデータ
     """
-    # is_confidential の場合、queryなど、AIへの入出力はログに残さない
-    sensitive_keys = ['message', 'messages', 'content', 'prompt', 'query', 'choices']
-    if is_confidential and key in sensitive_keys:
+    if not isinstance(value, (dict, list)):
+        return _truncate_leaf(key, value, is_confidential, max_length)
+    if is_confidential and key in _SENSITIVE_KEYS:
         return f"({key} is confidential)"
 
+    # フレーム: [元のコンテナ, 子要素のイテレータ, 複製（未変更ならNone）, 親コンテナ内での位置]
+    stack = [[value, _iter_children(key, value), None, None]]
+    while True:
+        frame = stack[-1]
+        node, children = frame[0], frame[1]
+        for slot, child_key, child in children:
+            if isinstance(child, (dict, list)) and not (is_confidential and child_key in _SENSITIVE_KEYS):
+                stack.append([child, _iter_children(child_key, child), None, slot])
+                break
+            new_child = _truncate_leaf(child_key, child, is_confidential, max_length)
+            if new_child is not child:
+                if frame[2] is None:
+                    frame[2] = node.copy()
+                frame[2][slot] = new_child
+        else:
+            # 子要素をすべて処理したので親へ結果を反映する
+            stack.pop()
+            done = node if frame[2] is None else frame[2]
+            if not stack:
+                return done
+            if done is not node:
+                parent = stack[-1]
+                if parent[2] is None:
+                    parent[2] = parent[0].copy()
+                parent[2][frame[3]] = done
+
+def _iter_children(key: str, value: Union[dict, list]):
+    """
+    コンテナの子要素を (位置, キー名, 値) の形で列挙する
+    リストの要素は親のキー名を引き継ぐ
+    """
     if isinstance(value, dict):
-        return {k: truncate_long_values(k, v, is_confidential, max_length) for k, v in value.items()}
-    elif isinstance(value, list):
-        return [truncate_long_values(key, item, is_confidential, max_length) for item in value]
-    elif isinstance(value, str):
-        # content_typeやfilenameなど、システム的な値は切り詰めない
-        if any(v in value.lower() for v in ['content-type', '.xlsx', '.pdf', '.doc']):
-            return value
-        # 半角英数字のみ、またはbase64エンコードされた文字列かチェック
-        if (re.match(r'^[a-zA-Z0-9]+$', value) or is_base64(value)) and len(value) > max_length:
-            return value[:max_length] + "...(truncated)"
+        return ((k, k, v) for k, v in value.items())
+    return ((i, key, v) for i, v in enumerate(value))
+
+def _truncate_leaf(key: str, value: Any, is_confidential: bool, max_length: int) -> Any:
+    """
+    コンテナ以外の値（またはマスク対象のコンテナ）を処理する
+    """
+    # is_confidential の場合、queryなど、AIへの入出力はログに残さない
+    if is_confidential and key in _SENSITIVE_KEYS:
+        return f"({key} is confidential)"
+    if not isinstance(value, str):
+        return value
+    # 切り詰め対象にならない短い文字列は判定自体を省略する
+    if len(value) <= max_length:
         return value
+    # content_typeやfilenameなど、システム的な値は切り詰めない
+    if _SYSTEM_VALUE_RE.search(value):
+        return value
+    # 半角英数字のみ、またはbase64エンコードされた文字列かチェック
+    if _ALNUM_RE.match(value) or is_base64(value):
+        return value[:max_length] + "...(truncated)"
     return value
 
 def is_base64(s: str) -> bool:
@@ -215,16 +394,6 @@ def is_base64(s: str) -> bool:
     Returns:
         bool: base64エンコードされていればTrue
     """
-    # base64の文字パターンチェック
-    if not re.match(r'^[A-Za-z0-9+/]*={0,2}$', s):
-        return False
-    # 長さチェック（4の倍数）
-    if len(s) % 4 != 0:
-        return False
-    try:
-        # デコードを試みる
-        decoded = base64.b64decode(s)
-        # バイナリデータとしてデコード可能か
-        return True
-    except Exception:
-        return False
+    # 文字パターンと長さ（4の倍数）だけで判定する
+    # 条件を満たす文字列は必ずデコードできるため、実際のデコードは行わない
+    return bool(_BASE64_RE.match(s)) and len(s) % 4 == 0
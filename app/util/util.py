@@ -1,39 +1,49 @@
 # util.py
 import re
-import threading
+import itertools
 import logging
 import requests
 import json
 import os
 from flask import request
 
-# リクエストIDのカウンター
-request_counter = 0
-request_counter_lock = threading.Lock()
+# リクエストIDのカウンター（itertools.count の next() はGIL下でアトミックなのでロック不要）
+request_counter = itertools.count(1)
 
 # ロガーの設定
 from util.log import setup_logger
 logger = setup_logger(__name__)
 
 def get_next_request_id():
-    global request_counter
-    with request_counter_lock:
-        request_counter += 1
-        return f"{request_counter:06d}"  # 6桁の0埋め整数
+    return f"{next(request_counter):06d}"  # 6桁の0埋め整数
 
-def get_client_app_name(request):
-    """クライアントアプリケーション名の取得"""
+def get_client_app_name(request, headers=None):
+    """クライアントアプリケーション名の取得（headers は取り出し済みのリクエストヘッダー。判定結果はリクエストごとにキャッシュする）"""
+    cached = getattr(request, '_client_app_name', None)
+    if cached is not None:
+        return cached
+    client_app_name = "Unknown"
     try:
         if request.is_json:
-            json_data = request.get_json()
-            client_name = json_data.get('client_name', "")
-            referer = request.headers.get('Referer', "")
-            if client_name:
-                return client_name
-            elif 'query' in json_data:
-                return "chrome-AI"
-            elif 'messages' in json_data or "chatai" in referer:
-                return "ChatAI"
+            # 解析結果（失敗時の None も含む）は Flask がリクエスト内でキャッシュする
+            json_data = request.get_json(cache=True, silent=True)
+            if isinstance(json_data, dict):
+                client_name = json_data.get('client_name', "")
+                referer = (headers if headers is not None else request.headers).get('Referer', "")
+                client_app_name = _classify_client(client_name, 'query' in json_data, 'messages' in json_data, referer)
+            else:
+                logger.error("JSONの解析エラー: JSONオブジェクトではありません")
     except Exception as e:
         logger.error(f"JSONの解析エラー: {str(e)}")
+    request._client_app_name = client_app_name
+    return client_app_name
+
+def _classify_client(client_name, has_query, has_messages, referer):
+    """リクエストの特徴からクライアントアプリケーション名を判定する"""
+    if client_name:
+        return client_name
+    elif has_query:
+        return "chrome-AI"
+    elif has_messages or "chatai" in referer:
+        return "ChatAI"
     return "Unknown"
@@ -32,6 +32,8 @@ echo ""
 echo "📁 認証情報ディレクトリの作成..."
 mkdir -p app/credentials
 echo "✅ app/credentials ディレクトリを作成しました"
+# キャッシュ用ディレクトリ（Dockerに作成させるとroot所有になり、コンテナから書き込めない）
+mkdir -p app/cache
 
 # 3. Gmail認証のセットアップ
 echo ""
@@ -73,11 +75,11 @@ fi
 # 5. Gmail認証トークンの生成
 echo ""
 echo "🔑 Gmail認証トークンの生成..."
-if [ ! -f app/credentials/token.pickle ]; then
+if [ ! -f app/credentials/token.json ]; then
     echo "初回認証を開始します..."
     python3 scripts/setup_gmail_auth.py
 
-    if [ $? -eq 0 ] && [ -f app/credentials/token.pickle ]; then
+    if [ $? -eq 0 ] && [ -f app/credentials/token.json ]; then
         echo "✅ Gmail認証が完了しました"
     else
         echo "⚠️  Gmail認証がスキップされました。後で手動で実行してください:"
@@ -96,7 +98,7 @@ else
         echo "🔐 トークンの再認証を開始します..."
         python3 scripts/setup_gmail_auth.py
 
-        if [ $? -eq 0 ] && [ -f app/credentials/token.pickle ]; then
+        if [ $? -eq 0 ] && [ -f app/credentials/token.json ]; then
             echo "✅ Gmail認証が更新されました"
         else
             echo "⚠️  Gmail認証の更新に失敗しました"
@@ -54,7 +54,7 @@ echo "🚀 コンテナを起動中..."
 docker compose -f $COMPOSE_FILE up -d
 
 # トークンの確認（bindマウントされているのでコピー不要）
-if [ -f app/credentials/token.pickle ]; then
+if [ -f app/credentials/token.json ]; then
     echo ""
     echo "✅ 認証トークンが検出されました（自動マウント）"
 else
@@ -6,13 +6,13 @@ Gmail認証のセットアップ/更新スクリプト
 使用方法:
 1. このスクリプトをローカル環境で実行
 2. ブラウザで認証
-3. 生成されたtoken.pickleをコンテナにコピー
+3. 生成されたtoken.jsonをコンテナにコピー
 """
 
-import pickle
 import sys
 from pathlib import Path
 from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 
@@ -21,11 +21,27 @@ SCOPES = [
     'https://www.googleapis.com/auth/gmail.modify'  # 既読マーク用
 ]
 
+def load_token(token_path):
+    """保存済みトークンを読み込む（JSONがなければ以前の形式の token.pickle を読み込む）"""
+    if token_path.exists():
+        return Credentials.from_authorized_user_file(str(token_path), SCOPES)
+    legacy_token_path = token_path.with_name('token.pickle')
+    if legacy_token_path.exists():
+        import pickle
+        with open(legacy_token_path, 'rb') as token:
+            return pickle.load(token)
+    return None
+
+def save_token(creds, token_path):
+    """トークンをJSON形式で保存"""
+    token_path.parent.mkdir(parents=True, exist_ok=True)
+    token_path.write_text(creds.to_json(), encoding='utf-8')
+
 def setup_gmail_auth():
     """Gmail認証をセットアップまたは更新"""
     creds = None
     base_dir = Path(__file__).parent.parent
-    token_path = base_dir / 'app/credentials/token.pickle'
+    token_path = base_dir / 'app/credentials/token.json'
     creds_path = base_dir / 'app/credentials/credentials.json'
 
     print("="*60)
@@ -46,15 +62,14 @@ def setup_gmail_auth():
     print(f"✅ credentials.json を検出: {creds_path}")
 
     # 既存トークンの確認
-    if token_path.exists():
+    if token_path.exists() or token_path.with_name('token.pickle').exists():
         print("📂 既存のトークンを検出、検証中...")
-        with open(token_path, 'rb') as token:
-            try:
-                creds = pickle.load(token)
-                print("✅ トークンの読み込み成功")
-            except Exception as e:
-                print(f"⚠️ トークンの読み込み失敗: {e}")
-                creds = None
+        try:
+            creds = load_token(token_path)
+            print("✅ トークンの読み込み成功")
+        except Exception as e:
+            print(f"⚠️ トークンの読み込み失敗: {e}")
+            creds = None
     else:
         print("🆕 初回セットアップを開始します")
 
@@ -96,9 +111,7 @@ def setup_gmail_auth():
         print("✅ 認証完了")
 
     # トークンの保存
-    token_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(token_path, 'wb') as token:
-        pickle.dump(creds, token)
+    save_token(creds, token_path)
     print(f"💾 トークンを保存: {token_path}")
 
     # 接続テスト
@@ -142,27 +155,27 @@ if __name__ == "__main__":
         if args.check:
             # 検証モード
             base_dir = Path(__file__).parent.parent
-            token_path = base_dir / 'app/credentials/token.pickle'
+            token_path = base_dir / 'app/credentials/token.json'
 
-            if not token_path.exists():
+            creds = load_token(token_path)
+            if creds is None:
                 print("❌ トークンが存在しません")
                 sys.exit(1)
 
-            with open(token_path, 'rb') as f:
-                creds = pickle.load(f)
-
             if not creds.valid:
                 if creds.expired and creds.refresh_token:
                     print("🔄 トークンの有効期限切れ、自動リフレッシュ中...")
                     creds.refresh(Request())
-                    with open(token_path, 'wb') as f:
-                        pickle.dump(creds, f)
+                    save_token(creds, token_path)
                     print("✅ トークンを自動更新しました")
                     sys.exit(0)
                 else:
                     print("❌ トークンが無効です。再認証が必要です")
                     sys.exit(1)
             else:
+                if not token_path.exists():
+                    # 以前の形式から読み込んだ場合はJSON形式で保存し直す
+                    save_token(creds, token_path)
                 print("✅ トークンは有効です")
                 sys.exit(0)
         else:
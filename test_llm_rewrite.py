@@ -5,13 +5,20 @@ LLMテキスト書き換え機能のテスト
 
 import os
 import sys
-import json
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from pathlib import Path
 
 # app ディレクトリをパスに追加
 sys.path.insert(0, str(Path(__file__).parent / 'app'))
 
+# 接続テスト用のセッション（keep-alive で接続を使い回す）
+session = requests.Session()
+adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+session.mount('http://', adapter)
+session.mount('https://', adapter)
+
 def test_llm_connection():
     """LLMエンドポイントへの接続テスト"""
     endpoint = os.getenv("LLM_ENDPOINT")
@@ -35,7 +42,7 @@ def test_llm_connection():
     }
 
     try:
-        response = requests.post(
+        response = session.post(
             endpoint,
             headers={"Content-Type": "application/json"},
             json=test_request,
@@ -69,6 +76,8 @@ def test_text_rewriting():
     from send_tweet import TextRewriter, Config
 
     config = Config()
+    # 毎回 LLM を呼び出して確認するため、書き換え結果のファイルキャッシュは使わない（app/cache にも書き込まない）
+    config.llm_cache_dir = ""
     rewriter = TextRewriter(config)
 
     # テストケース
@@ -79,12 +88,13 @@ def test_text_rewriting():
     ]
 
     print("\n=== テキスト書き換えテスト ===")
-    for i, original in enumerate(test_cases, 1):
+    # LLMへのリクエストは並行して送り、結果はケース順に表示する
+    with ThreadPoolExecutor(max_workers=len(test_cases)) as executor:
+        results = list(executor.map(rewriter.rewrite_text, test_cases))
+
+    for i, (original, rewritten) in enumerate(zip(test_cases, results), 1):
         print(f"\nケース {i}:")
         print(f"【元のテキスト】\n{original}")
-
-        rewritten = rewriter.rewrite_text(original)
-
         print(f"【書き換え後】\n{rewritten}")
         print("-" * 50)
 
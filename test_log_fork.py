@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+fork されたプロセスからのログ出力テスト
+uWSGI（lazy-apps なし）と同様に、ロガーを初期化したプロセスから fork した子プロセスのログが
+log.log に書き込まれることを確認する
+"""
+
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+# app ディレクトリをパスに追加
+sys.path.insert(0, str(Path(__file__).parent / 'app'))
+
+def wait_for_marker(path, marker, timeout=5.0):
+    """ファイルに marker が書き込まれるまで待つ"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if path.exists() and marker in path.read_text(encoding='utf-8', errors='replace'):
+            return True
+        time.sleep(0.05)
+    return False
+
+def test_log_from_forked_child():
+    """fork 後の子プロセスのログがファイルに書き込まれること"""
+    from util import log
+
+    # 親プロセスでリスナーを起動してから fork する
+    log.logger.info("fork test: parent %s", os.getpid())
+    marker = f"fork-test-{uuid.uuid4().hex}"
+    # log.log の場所はロガーのハンドラから取得する
+    log_path = Path(log.logger.handlers[0].file_handler.baseFilename)
+
+    pid = os.fork()
+    if pid == 0:
+        # 子プロセス: ログを出力し、ファイルに書き込まれたかを終了コードで返す
+        ok = False
+        try:
+            log.logger.info("%s", marker)
+            ok = wait_for_marker(log_path, marker)
+        finally:
+            os._exit(0 if ok else 1)
+
+    _, status = os.waitpid(pid, 0)
+    assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0, "子プロセスのログが書き込まれませんでした"
+
+if __name__ == "__main__":
+    test_log_from_forked_child()
+    print("✓ fork された子プロセスのログが書き込まれました")
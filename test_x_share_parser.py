@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+X共有メール解析のテスト
+定型文の除去結果が、パターンを順番に適用していた従来の出力と一致することを確認する
+"""
+
+import sys
+from pathlib import Path
+
+# app ディレクトリをパスに追加
+sys.path.insert(0, str(Path(__file__).parent / 'app'))
+
+def test_clean_patterns_applied_in_order():
+    """「Shared from」を除去した後の本文に「shared ... tweet」パターンが掛からないこと"""
+    from send_tweet import XShareParser
+
+    email = {
+        'body': "Foo Shared from X: tweet: body\nhttps://x.com/user/status/123",
+        'subject': '',
+    }
+    info = XShareParser().extract_x_info(email)
+    assert info is not None
+    assert info['text'] == "Foo tweet: body"
+    assert info['username'] == "user"
+    assert info['tweet_id'] == "123"
+
+if __name__ == "__main__":
+    test_clean_patterns_applied_in_order()
+    print("✓ 定型文の除去結果が従来と一致しました")